@@ -0,0 +1,88 @@
+import numpy as np
+
+# --- Server-side pre-aggregation for the charts ---
+# Charts are built from these small summaries instead of the raw rows, so the
+# figure JSON sent to the browser has the same size at 15k or 15M rows.
+
+
+def value_histogram(values):
+    """Distinct values and their counts for a numeric column (NaNs dropped).
+
+    This is the building block for both the bin counts and the box-plot
+    statistics below, and it can be merged across chunks by summing counts.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    uniques, counts = np.unique(values, return_counts=True)
+    return uniques, counts
+
+
+def merge_value_histograms(*histograms):
+    """Combine several (uniques, counts) value histograms into one."""
+    uniques = np.concatenate([h[0] for h in histograms])
+    counts = np.concatenate([h[1] for h in histograms])
+    merged, inverse = np.unique(uniques, return_inverse=True)
+    return merged, np.bincount(inverse, weights=counts, minlength=len(merged)).astype(np.int64)
+
+
+def histogram_bins(uniques, counts, nbins=20):
+    """Equal-width bin edges and bin counts from a value histogram."""
+    if len(uniques) == 0:
+        return np.array([0.0, 1.0]), np.array([0])
+    lo, hi = float(uniques[0]), float(uniques[-1])
+    if hi == lo:
+        hi = lo + 1.0
+    width = (hi - lo) / nbins
+    # Integer-valued columns (ages, speeds) get integer-aligned bins like Plotly's
+    if np.all(uniques == np.round(uniques)):
+        width = max(1.0, np.ceil(width))
+    edges = lo + width * np.arange(int(np.ceil((hi - lo) / width)) + 1)
+    bin_counts, _ = np.histogram(uniques, bins=edges, weights=counts)
+    return edges, bin_counts.astype(np.int64)
+
+
+def _weighted_quantile(uniques, counts, q):
+    # Linear interpolation between order statistics, same as np.quantile's default
+    total = counts.sum()
+    cumulative = np.cumsum(counts)
+    position = q * (total - 1)
+    lower, frac = int(np.floor(position)), position - np.floor(position)
+    lower_value = uniques[np.searchsorted(cumulative, lower, side='right')]
+    upper_value = uniques[np.searchsorted(cumulative, min(lower + 1, total - 1), side='right')]
+    return float(lower_value + frac * (upper_value - lower_value))
+
+
+def box_stats(uniques, counts):
+    """Quartiles, Tukey whiskers and outliers from a value histogram.
+
+    Returns a dict with q1/median/q3, lowerfence/upperfence (the most extreme
+    values within 1.5 IQR, as Plotly draws them) and the distinct outlier
+    values with their counts.
+    """
+    if len(uniques) == 0:
+        return None
+    q1 = _weighted_quantile(uniques, counts, 0.25)
+    median = _weighted_quantile(uniques, counts, 0.5)
+    q3 = _weighted_quantile(uniques, counts, 0.75)
+    iqr = q3 - q1
+    inside = (uniques >= q1 - 1.5 * iqr) & (uniques <= q3 + 1.5 * iqr)
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': float(uniques[inside].min()),
+        'upperfence': float(uniques[inside].max()),
+        'outliers': uniques[~inside].tolist(),
+        'outlier_counts': counts[~inside].tolist(),
+    }
+
+
+def numeric_summary(values, nbins=20):
+    """Bin counts plus box statistics for the values of one numeric column."""
+    return summary_from_histogram(*value_histogram(values), nbins=nbins)
+
+
+def summary_from_histogram(uniques, counts, nbins=20):
+    """numeric_summary() for data already reduced to a value histogram."""
+    edges, bin_counts = histogram_bins(uniques, counts, nbins)
+    return {'edges': edges, 'counts': bin_counts, 'box': box_stats(uniques, counts)}
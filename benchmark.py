@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import plotly.express as px
+
+from aggregates import numeric_summary
+from charts import histogram_with_box, stacked_count_bar
+from data import DATA_FILE, NUMERIC_COLUMNS, make_dummy_data, memory_report
+from cube import CUBE_DIMENSIONS
+from parallel import aggregate_rows, encode_rows
+from store import open_store, publish_store
+
+# --- Benchmarks ---
+# Usage: python benchmark.py pages [--rows 15000 1000000 10000000]   (headless page runs, saved to BENCHMARK_DIR)
+#        python benchmark.py compare OLD.json NEW.json                 (regressions between two saved runs)
+#        python benchmark.py payload [--rows ...]                      (raw-row vs pre-aggregated figure JSON)
+#        python benchmark.py memory                                    (per-column memory footprint)
+#        python benchmark.py parallel [--rows N] [--workers 1 2 4 8]   (aggregation throughput per worker count)
+
+PAGES = ['page1.py', 'page2.py', 'page3.py', 'page4.py', 'page5.py']
+BENCHMARK_DIR = '.benchmarks'
+
+
+def _raw_figures(df):
+    return {
+        'weather_severity': px.histogram(df, x='Weather', color='Accident_Severity', barmode='stack'),
+        'road_condition_severity': px.histogram(df, x='Road_condition', color='Accident_Severity', barmode='stack'),
+        'biker_age': px.histogram(df, x='Biker_Age', nbins=20, marginal='box'),
+    }
+
+
+def _crosstab_counts(df, x, color):
+    # Long-form two-way counts [x, color, 'Count'], as the pages got them before the cube
+    counts = df.groupby([x, color], observed=True).size().reset_index(name='Count')
+    return counts[counts['Count'] > 0].reset_index(drop=True)
+
+
+def _aggregated_figures(df):
+    return {
+        'weather_severity': stacked_count_bar(
+            _crosstab_counts(df, 'Weather', 'Accident_Severity'), x='Weather', color='Accident_Severity', title=None),
+        'road_condition_severity': stacked_count_bar(
+            _crosstab_counts(df, 'Road_condition', 'Accident_Severity'), x='Road_condition', color='Accident_Severity', title=None),
+        'biker_age': histogram_with_box(numeric_summary(df['Biker_Age'], nbins=20), title=None, name='Biker Age'),
+    }
+
+
+def _measure(build, df):
+    start = time.perf_counter()
+    figures = build(df)
+    sizes = {name: len(fig.to_json()) for name, fig in figures.items()}
+    return time.perf_counter() - start, sizes
+
+
+def compare_figure_payloads(row_counts):
+    """Build the raw and pre-aggregated figures at each size and return one result row per chart."""
+    results = []
+    for rows in row_counts:
+        df = make_dummy_data(rows)
+        raw_seconds, raw_sizes = _measure(_raw_figures, df)
+        agg_seconds, agg_sizes = _measure(_aggregated_figures, df)
+        for chart in raw_sizes:
+            results.append({
+                'rows': rows,
+                'chart': chart,
+                'raw_bytes': raw_sizes[chart],
+                'aggregated_bytes': agg_sizes[chart],
+            })
+        results.append({'rows': rows, 'chart': '(build + serialize, s)', 'raw_bytes': round(raw_seconds, 3),
+                        'aggregated_bytes': round(agg_seconds, 3)})
+    return results
+
+
+# --- Headless page benchmark ---
+# Each (page, size) runs in a fresh subprocess with its own cache directory,
+# so cold start and peak RSS are not flattered by an earlier run.
+
+
+def _run_page_worker(page):
+    # Runs inside the subprocess: environment already points at the synthetic data
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.abspath(page), default_timeout=3600)
+    start = time.perf_counter()
+    app.run()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    app.run()
+    rerun = time.perf_counter() - start
+
+    figures = [element.proto.spec for element in app.get('plotly_chart')]
+    return {
+        'cold_start_s': round(cold, 3),
+        'rerun_s': round(rerun, 4),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'figures': len(figures),
+        'figure_json_bytes': sum(len(spec) for spec in figures),
+        'errors': [str(e.value) for e in app.exception],
+    }
+
+
+def benchmark_pages(row_counts, pages=PAGES, workdir=None):
+    """Run every page headlessly against synthetic data of each size; one result dict per run."""
+    workdir = workdir or tempfile.mkdtemp(prefix='accident-bench-')
+    results = []
+    try:
+        for rows in row_counts:
+            csv_path = os.path.join(workdir, f'synthetic-{rows}.csv')
+            start = time.perf_counter()
+            make_dummy_data(rows).to_csv(csv_path, index=False)
+            print(f"generated {rows:,} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            for page in pages:
+                cache_dir = os.path.join(workdir, f'cache-{rows}-{page}')
+                env = dict(os.environ, ACCIDENT_DATA_FILE=csv_path, ACCIDENT_CACHE_DIR=cache_dir)
+                output = subprocess.run(
+                    [sys.executable, __file__, '_worker', page], env=env, check=True,
+                    capture_output=True, text=True,
+                ).stdout
+                result = dict(json.loads(output.strip().splitlines()[-1]), page=page, rows=rows)
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            os.remove(csv_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(results):
+    """Write results to BENCHMARK_DIR/<commit>.json and return the path."""
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    commit = _git_commit()
+    path = os.path.join(BENCHMARK_DIR, f'{commit}.json')
+    with open(path, 'w') as f:
+        json.dump({'commit': commit, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=2)
+    return path
+
+
+METRICS = ['cold_start_s', 'rerun_s', 'peak_rss_mb', 'figure_json_bytes']
+
+
+def compare_results(old_path, new_path):
+    """Rows of (page, rows, metric, old, new, change %) for runs present in both files."""
+    with open(old_path) as f:
+        old = {(r['page'], r['rows']): r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {(r['page'], r['rows']): r for r in json.load(f)['results']}
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        for metric in METRICS:
+            before, after = old[key][metric], new[key][metric]
+            change = (after - before) / before * 100 if before else 0.0
+            rows.append((*key, metric, before, after, round(change, 1)))
+    return rows
+
+
+def benchmark_parallel(rows, worker_counts):
+    """Rows/s of the numeric value histograms (all NUMERIC_COLUMNS) plus the cube encoding, for each worker count."""
+    workdir = tempfile.mkdtemp(prefix='accident-bench-')
+    try:
+        store = publish_store(make_dummy_data(rows), os.path.join(workdir, 'store'), 'benchmark')
+        df = open_store(store)
+        results = []
+        for workers in worker_counts:
+            aggregate_rows(df, NUMERIC_COLUMNS, store, workers=workers)  # warm up the pool
+            start = time.perf_counter()
+            aggregate_rows(df, NUMERIC_COLUMNS, store, workers=workers)
+            encode_rows(df, CUBE_DIMENSIONS, store, workers=workers)
+            seconds = time.perf_counter() - start
+            results.append({'workers': workers, 'seconds': round(seconds, 3), 'rows_per_s': int(rows / seconds)})
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _print_pages(results):
+    print(f"{'page':<10}{'rows':>11}{'cold s':>9}{'rerun s':>9}{'RSS MB':>9}{'fig bytes':>11}  errors")
+    for r in results:
+        print(f"{r['page']:<10}{r['rows']:>11,}{r['cold_start_s']:>9}{r['rerun_s']:>9}"
+              f"{r['peak_rss_mb']:>9}{r['figure_json_bytes']:>11,}  {len(r['errors'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for the accident dashboard.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    pages = commands.add_parser('pages', help='run each page headlessly at several dataset sizes')
+    pages.add_argument('--rows', type=int, nargs='+', default=[15_000, 1_000_000, 10_000_000])
+    pages.add_argument('--pages', nargs='+', default=PAGES)
+    compare = commands.add_parser('compare', help='compare two saved page benchmark runs')
+    compare.add_argument('old')
+    compare.add_argument('new')
+    payload = commands.add_parser('payload', help='figure JSON size for raw-row vs pre-aggregated charts')
+    payload.add_argument('--rows', type=int, nargs='+', default=[15_000, 150_000, 1_500_000])
+    commands.add_parser('memory', help='per-column memory footprint of the dataset')
+    scaling = commands.add_parser('parallel', help='aggregation throughput for several worker counts')
+    scaling.add_argument('--rows', type=int, default=10_000_000)
+    scaling.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    worker = commands.add_parser('_worker')
+    worker.add_argument('page')
+    args = parser.parse_args()
+
+    if args.command == '_worker':
+        print(json.dumps(_run_page_worker(args.page)))
+    elif args.command == 'pages':
+        results = benchmark_pages(args.rows, args.pages)
+        _print_pages(results)
+        print(f"saved to {save_results(results)}")
+    elif args.command == 'compare':
+        print(f"{'page':<10}{'rows':>11}  {'metric':<18}{'old':>12}{'new':>12}{'change %':>10}")
+        for page, rows, metric, before, after, change in compare_results(args.old, args.new):
+            print(f"{page:<10}{rows:>11,}  {metric:<18}{before:>12}{after:>12}{change:>10}")
+    elif args.command == 'parallel':
+        base = None
+        for r in benchmark_parallel(args.rows, args.workers):
+            base = base or r['rows_per_s']
+            print(f"{r['workers']:>3} workers  {r['seconds']:>8}s  {r['rows_per_s']:>12,} rows/s  x{r['rows_per_s'] / base:.2f}")
+    elif args.command == 'memory':
+        print(memory_report(DATA_FILE).to_string())
+    else:
+        print(f"{'rows':>10}  {'chart':<26}{'raw':>14}{'aggregated':>14}")
+        for r in compare_figure_payloads(args.rows):
+            print(f"{r['rows']:>10}  {r['chart']:<26}{r['raw_bytes']:>14}{r['aggregated_bytes']:>14}")
+
+
+if __name__ == '__main__':
+    main()
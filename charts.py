@@ -0,0 +1,135 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# --- Figure builders working from pre-aggregated data (see aggregates.py) ---
+
+
+def stacked_count_bar(counts, x, color, title, labels=None, category_orders=None, color_discrete_sequence=None):
+    """Stacked bar chart from long-form crosstab counts [x, color, 'Count'].
+
+    Renders the same chart as px.histogram(df, x=x, color=color, barmode='stack')
+    without embedding the raw rows in the figure. An 'Error' column (sample
+    estimates, see sampling.py) is drawn as error bars.
+    """
+    return px.bar(
+        counts,
+        x=x,
+        y='Count',
+        error_y='Error' if 'Error' in counts.columns else None,
+        color=color,
+        barmode='stack',
+        title=title,
+        labels=labels,
+        category_orders=category_orders,
+        color_discrete_sequence=color_discrete_sequence,
+    )
+
+
+def histogram_with_box(summary, title, name, color='#E63946', opacity=0.8):
+    """Histogram with a marginal box plot from numeric_summary() output.
+
+    Equivalent to px.histogram(df, x=..., marginal='box'): the bars come from
+    the precomputed bin counts and the box from precomputed quartiles,
+    whiskers and distinct outlier values. Per-bin 'errors' in the summary
+    (sample estimates, see sampling.py) are drawn as error bars.
+    """
+    edges, counts, box = summary['edges'], summary['counts'], summary['box']
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.26, 0.74], vertical_spacing=0.03)
+
+    if box is not None:
+        fig.add_trace(
+            go.Box(
+                q1=[box['q1']], median=[box['median']], q3=[box['q3']],
+                lowerfence=[box['lowerfence']], upperfence=[box['upperfence']],
+                y=[name], orientation='h', name=name, boxpoints=False,
+                marker_color=color, showlegend=False, hoverinfo='x',
+            ),
+            row=1, col=1,
+        )
+        if box['outliers']:
+            fig.add_trace(
+                go.Scatter(
+                    x=box['outliers'], y=[name] * len(box['outliers']),
+                    customdata=box['outlier_counts'], mode='markers', marker_color=color,
+                    showlegend=False, hovertemplate='%{x} (%{customdata} riders)<extra>outlier</extra>',
+                ),
+                row=1, col=1,
+            )
+
+    centers = (edges[:-1] + edges[1:]) / 2
+    fig.add_trace(
+        go.Bar(
+            x=centers, y=counts, width=edges[1:] - edges[:-1], name=name,
+            error_y=None if summary.get('errors') is None else dict(type='data', array=summary['errors']),
+            marker_color=color, opacity=opacity, showlegend=False,
+            customdata=list(zip(edges[:-1], edges[1:])),
+            hovertemplate='%{customdata[0]}-%{customdata[1]}: %{y}<extra></extra>',
+        ),
+        row=2, col=1,
+    )
+    fig.update_layout(title=title, bargap=0)
+    fig.update_yaxes(showticklabels=False, row=1, col=1)
+    return fig
+
+
+def rate_with_interval(rates, x, title, reference=None, color='#E63946'):
+    """Bar chart of severity_rates() output: the rate per condition with its confidence interval.
+
+    `reference` (e.g. the overall rate) is drawn as a dashed horizontal line.
+    """
+    fig = go.Figure(
+        go.Bar(
+            x=rates['condition'], y=rates['rate'], marker_color=color,
+            error_y=dict(
+                type='data', symmetric=False,
+                array=rates['rate_high'] - rates['rate'], arrayminus=rates['rate'] - rates['rate_low'],
+            ),
+            customdata=rates[['severe', 'accidents', 'relative_risk']],
+            hovertemplate='%{x}: %{y:.1%} (%{customdata[0]} of %{customdata[1]})<br>relative risk %{customdata[2]:.2f}<extra></extra>',
+        )
+    )
+    if reference is not None:
+        fig.add_hline(y=reference, line_dash='dash', line_color='grey', annotation_text=f'all accidents: {reference:.1%}')
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title='Share of severe accidents', yaxis_tickformat='.0%')
+    return fig
+
+
+def density_raster(image, x_bins, y_bins, title, x_label, y_label, legend=None, max_count=None, colorscale='Viridis'):
+    """Rasterised density from density.density_image(), sent to the browser as one PNG.
+
+    `legend` is [(name, colour)] when pixels are coloured by group; otherwise a
+    log colour bar up to `max_count` points per pixel is drawn.
+    """
+    (x0, dx, nx), (y0, dy, ny) = x_bins, y_bins
+    fig = px.imshow(
+        image,
+        x=x0 + dx * (np.arange(nx) + 0.5),
+        y=y0 + dy * (np.arange(ny) + 0.5),
+        origin='lower',
+        binary_string=True,
+        aspect='auto',
+    )
+    fig.update_traces(hovertemplate=f'{x_label}: %{{x:.1f}}<br>{y_label}: %{{y:.1f}}<extra></extra>')
+
+    # Legend / colour bar through empty marker traces: the image itself carries no data values
+    for name, color in legend or []:
+        fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', name=name, marker=dict(color=color, size=10, symbol='square')))
+    if legend is None and max_count:
+        ticks = [t for t in (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000) if t <= max_count]
+        fig.add_trace(go.Scatter(
+            x=[None], y=[None], mode='markers', showlegend=False,
+            marker=dict(
+                colorscale=colorscale, cmin=0, cmax=np.log1p(max_count), color=[0], showscale=True,
+                colorbar=dict(title='Accidents', tickvals=np.log1p(ticks).tolist(), ticktext=[f'{t:,}' for t in ticks]),
+            ),
+        ))
+
+    fig.update_layout(
+        title=title, xaxis_title=x_label, yaxis_title=y_label,
+        # Dragging selects a box: the page re-bins that range instead of stretching the pixels
+        dragmode='select', xaxis_range=[x0, x0 + dx * nx], yaxis_range=[y0, y0 + dy * ny],
+        legend_title='Severity' if legend else None,
+    )
+    return fig
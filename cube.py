@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from profiling import current_profile
+
+# --- Precomputed categorical data cube ---
+# Every count chart is a one- or two-way group-by over the same small set of
+# categorical columns. The cube holds the full joint count table over those
+# columns (a few thousand cells), built once per dataset version with a single
+# np.bincount over a combined integer key. Any 1-, 2- or 3-way count is then a
+# sum over the other axes; the rows are never scanned again.
+
+CUBE_DIMENSIONS = [
+    'Biker_Occupation',
+    'Biker_Education_Level',
+    'Weather',
+    'Time_of_Day',
+    'Road_Type',
+    'Road_condition',
+    'Wearing_Helmet',
+    'Bike_Condition',
+    'Accident_Severity',
+]
+
+
+class CategoryCube:
+    """Joint count table over categorical dimensions.
+
+    `array` has one axis per dimension, of length len(levels[dim]) + 1: the
+    last slot along each axis counts missing values, which are left out of
+    query results the way value_counts() leaves out NaN.
+    """
+
+    def __init__(self, dims, levels, array):
+        self.dims = list(dims)
+        self.levels = {dim: list(levels[dim]) for dim in self.dims}
+        self.array = array
+
+    @property
+    def total(self):
+        return int(self.array.sum())
+
+    def __contains__(self, dim):
+        return dim in self.levels
+
+    def count(self, *dims, name='Count'):
+        """Counts grouped by `dims` as a long DataFrame [*dims, name].
+
+        One dimension gives value_counts() order (descending); more give
+        every non-zero combination in level order.
+        """
+        with current_profile().stage('aggregate'):
+            return self._count(dims, name)
+
+    def _count(self, dims, name):
+        axes = [self.dims.index(dim) for dim in dims]
+        other = tuple(i for i in range(len(self.dims)) if i not in axes)
+        table = self.array.sum(axis=other)
+        # sum() keeps the remaining axes in cube order; put them in the requested order
+        table = np.moveaxis(table, np.argsort(np.argsort(axes)), range(len(axes)))
+        table = table[tuple(slice(0, len(self.levels[dim])) for dim in dims)]
+
+        index = pd.MultiIndex.from_product([self.levels[dim] for dim in dims], names=list(dims))
+        counts = pd.Series(table.ravel(), index=index, name=name)
+        counts = counts[counts > 0]
+        if len(dims) == 1:
+            counts = counts.sort_values(ascending=False, kind='stable')
+        return counts.reset_index()
+
+    def restrict(self, selection):
+        """Cube with counts outside `selection` ({dim: [levels]}) zeroed out.
+
+        Dimensions and levels are kept, so the result can be queried exactly
+        like the full cube.
+        """
+        array = self.array
+        for dim, values in selection.items():
+            keep = np.zeros(len(self.levels[dim]) + 1, dtype=bool)
+            keep[[self.levels[dim].index(v) for v in values if v in self.levels[dim]]] = True
+            shape = [1] * array.ndim
+            shape[self.dims.index(dim)] = -1
+            array = array * keep.reshape(shape)
+        return CategoryCube(self.dims, self.levels, array)
+
+    def merge(self, other):
+        """Cube holding the counts of both cubes (levels are unioned)."""
+        levels = {dim: self.levels[dim] + [v for v in other.levels[dim] if v not in self.levels[dim]]
+                  for dim in self.dims}
+        return CategoryCube(self.dims, levels, _aligned(self, levels) + _aligned(other, levels))
+
+
+def _aligned(cube, levels):
+    # Re-lay a cube's array onto a (superset) level list for each dimension
+    shape = tuple(len(levels[dim]) + 1 for dim in cube.dims)
+    out = np.zeros(shape, dtype=np.int64)
+    index = tuple(
+        np.array([levels[dim].index(v) for v in cube.levels[dim]] + [len(levels[dim])])
+        for dim in cube.dims
+    )
+    out[np.ix_(*index)] = cube.array
+    return out
+
+
+def category_codes(values, levels):
+    """Position of each value of `values` in `levels`: len(levels) for missing values, -1 for other values."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Look the (few) categories up once, then index by the codes; code -1 (missing) takes the last slot
+        lookup = np.append(pd.Index(levels).get_indexer(values.cat.categories), len(levels))
+        return lookup[np.asarray(values.cat.codes)]
+    codes = pd.Index(levels).get_indexer(values)
+    return np.where(pd.isna(values), len(levels), codes)
+
+
+def encode_categories(df, dims=None, levels=None):
+    """Integer-code the categorical columns of `df`.
+
+    Returns (dims, levels, shape, key) where `key` is each row's flat cell
+    index into a cube of `shape` (smallest unsigned dtype that fits). With
+    `levels` ({dim: [levels]}) the rows are coded against those levels, so
+    keys of different row ranges line up; a value outside them raises
+    ValueError.
+    """
+    dims = [dim for dim in (dims or CUBE_DIMENSIONS) if dim in df.columns]
+    fixed, levels, codes = levels, {}, []
+    for dim in dims:
+        if fixed is None:
+            dim_codes, dim_levels = pd.factorize(df[dim], sort=True)
+            # NaN is coded -1 by factorize; move it to the trailing "missing" slot
+            dim_codes = np.where(dim_codes < 0, len(dim_levels), dim_codes)
+        else:
+            dim_levels = fixed[dim]
+            dim_codes = category_codes(df[dim], dim_levels)
+            if np.any(dim_codes < 0):
+                raise ValueError(f"{dim} has values outside the given levels")
+        levels[dim] = list(dim_levels)
+        codes.append(dim_codes)
+
+    shape = tuple(len(levels[dim]) + 1 for dim in dims)
+    key = np.ravel_multi_index(codes, shape) if dims else np.zeros(len(df), dtype=np.intp)
+    return dims, levels, shape, key.astype(np.min_scalar_type(int(np.prod(shape)) - 1))
+
+
+def cube_from_keys(dims, levels, shape, key):
+    """CategoryCube counting the flat cell indices in `key`."""
+    array = np.bincount(key, minlength=int(np.prod(shape))).reshape(shape)
+    return CategoryCube(dims, levels, array)
+
+
+def build_cube(df, dims=None):
+    """Build a CategoryCube from the categorical columns of `df` present in `dims`."""
+    return cube_from_keys(*encode_categories(df, dims))
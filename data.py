@@ -0,0 +1,461 @@
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows: appends are then only safe from one process at a time
+    fcntl = None
+
+from store import append_store, latest_store, open_store, prune_store, publish_store
+
+# --- Shared dataset loader used by every page ---
+# The CSV is parsed once and a columnar (Parquet) copy is written to CACHE_DIR.
+# The copy is keyed by the source file's size, mtime and content hash, so it is
+# reused until the CSV itself changes. Pages get the dataset from a
+# memory-mapped column store published from that copy (see store.py).
+#
+# Appends (append_rows) add a delta part to the copy, and the next load
+# appends just those rows to the store; copies, stores and aggregates of
+# superseded versions are then deleted (see prune_cache).
+
+# Both can be overridden from the environment (the benchmark points them at synthetic data)
+DATA_FILE = os.environ.get("ACCIDENT_DATA_FILE", "motorbike_accident_severity.csv")
+CACHE_DIR = os.environ.get("ACCIDENT_CACHE_DIR", ".data_cache")
+MANIFEST_FILE = os.path.join(CACHE_DIR, "manifest.json")
+
+# Delta parts the columnar copy may accumulate before they are compacted into one file
+MAX_PARTS = 16
+
+NUMERIC_COLUMNS = [
+    'Biker_Age',
+    'Riding_Experience',
+    'Daily_Travel_Distance',
+    'Traffic_Density',
+    'Speed_Limit',
+    'Bike_Speed',
+]
+
+# Compact in-memory schema applied at load time. Strings are low-cardinality
+# categoricals; whole-number columns are small unsigned ints. An integer
+# column holding NaN, fractions or out-of-range values falls back to the
+# smallest type that still represents it (see apply_schema).
+SCHEMA = {
+    'Biker_Age': 'uint8',
+    'Biker_Occupation': 'category',
+    'Biker_Education_Level': 'category',
+    'Riding_Experience': 'float32',
+    'Daily_Travel_Distance': 'uint16',
+    'Wearing_Helmet': 'category',
+    'Bike_Condition': 'category',
+    'Road_Type': 'category',
+    'Road_condition': 'category',
+    'Weather': 'category',
+    'Time_of_Day': 'category',
+    'Traffic_Density': 'uint8',
+    'Speed_Limit': 'uint8',
+    'Bike_Speed': 'uint8',
+    'Accident_Severity': 'category',
+}
+CSV_DTYPES = {column: dtype for column, dtype in SCHEMA.items() if dtype == 'category'}
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_manifest(manifest):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = MANIFEST_FILE + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+_held_locks = threading.local()
+
+
+@contextmanager
+def dataset_lock(path=DATA_FILE):
+    """Hold an exclusive lock on changes to the dataset at `path`, across threads and processes.
+
+    Re-entrant within a thread, so a caller can hold it around append_rows().
+    """
+    key = os.path.abspath(path)
+    held = _held_locks.__dict__.setdefault("paths", set())
+    if key in held:
+        yield
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(cache_path(path, "append", "lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+            # Closing the file releases the lock
+
+
+def _hash_file(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path=DATA_FILE):
+    """Return {'size', 'mtime_ns', 'sha256'} for `path`, or None if it is missing.
+
+    The content hash is only recomputed when size or mtime differ from the
+    last recorded fingerprint, so an unchanged file costs a single stat().
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    key = os.path.abspath(path)
+    known = _read_manifest().get(key)
+    if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+        return known
+
+    # Changed (or an append is being recorded): wait for any append to finish, then look again
+    with dataset_lock(path):
+        stat = os.stat(path)
+        manifest = _read_manifest()
+        known = manifest.get(key)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _hash_file(path)}
+        manifest[key] = fingerprint
+        _write_manifest(manifest)
+    return fingerprint
+
+
+def _record(path, version, **fields):
+    # Add `fields` to the manifest entry of `path`, if it still describes dataset `version`
+    with dataset_lock(path):
+        manifest = _read_manifest()
+        fingerprint = manifest.get(os.path.abspath(path))
+        if fingerprint is not None and _version_of(fingerprint) == version:
+            fingerprint.update(fields)
+            _write_manifest(manifest)
+
+
+def _integer_dtype(values, dtype):
+    # The declared unsigned type if the values fit, else the smallest one that does, else float32
+    finite = values[~np.isnan(values)]
+    if len(finite) < len(values) or not np.all(finite == np.round(finite)) or (len(finite) and finite.min() < 0):
+        return 'float32'
+    if len(finite) and finite.max() > np.iinfo(dtype).max:
+        return np.min_scalar_type(int(finite.max())).name
+    return dtype
+
+
+def apply_schema(df):
+    """Cast the known columns of `df` to the compact SCHEMA dtypes (in place) and return it."""
+    for column, dtype in SCHEMA.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if dtype == 'category':
+            df[column] = df[column].astype('category')
+            continue
+        values = df[column].to_numpy(dtype=float)
+        if dtype.startswith('uint'):
+            dtype = _integer_dtype(values, dtype)
+        df[column] = values.astype(dtype)
+    return df
+
+
+def memory_report(path=DATA_FILE):
+    """Per-column bytes of the dataset at `path` as plain pd.read_csv loads it vs. as the app holds it (SCHEMA applied)."""
+    before = pd.read_csv(path)
+    after = read_csv_cached(path)
+
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'bytes_before': before.memory_usage(deep=True, index=False),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_after': after.memory_usage(deep=True, index=False),
+    })
+    report.loc['TOTAL'] = ['', report['bytes_before'].sum(), '', report['bytes_after'].sum()]
+    report['ratio'] = (report['bytes_before'] / report['bytes_after']).round(1)
+    return report
+
+
+def _version_of(fingerprint):
+    return f"{fingerprint['size']}-{fingerprint['sha256'][:16]}"
+
+
+def dataset_version(path=DATA_FILE):
+    """Short version string for the dataset at `path` (None if the file is missing)."""
+    fingerprint = file_fingerprint(path)
+    if fingerprint is None:
+        return None
+    return _version_of(fingerprint)
+
+
+def cache_path(path, version, suffix="parquet"):
+    """Where derived data for dataset `version` of `path` lives in CACHE_DIR."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{version}.{suffix}")
+
+
+def _columnar_parts(path, version):
+    """[(Parquet file, rows)] that together hold dataset `version`, or None if there is no complete copy.
+
+    A freshly parsed version is one file; each append_rows() adds a delta
+    part. `rows` is None for a copy whose row count was not recorded.
+    """
+    fingerprint = file_fingerprint(path)
+    if fingerprint is not None and _version_of(fingerprint) == version and fingerprint.get("parts"):
+        parts = [(os.path.join(CACHE_DIR, part[0]), part[1]) if isinstance(part, list) else (None, None)
+                 for part in fingerprint["parts"]]
+    else:
+        parts = [(cache_path(path, version), None)]
+    return parts if all(part is not None and os.path.exists(part) for part, _ in parts) else None
+
+
+def _write_parquet(df, target):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = target + f".{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+
+
+def read_csv_cached(path=DATA_FILE, version=None):
+    """Read `path`, going through the Parquet copy when one exists for `version`."""
+    version = version or dataset_version(path)
+    parts = _columnar_parts(path, version)
+    if parts:
+        try:
+            frames = [pd.read_parquet(part) for part, _ in parts]
+            # Concatenating categoricals with different categories gives object columns: re-apply the schema
+            return apply_schema(frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True))
+        except ImportError:
+            pass
+
+    df = apply_schema(pd.read_csv(path, dtype=CSV_DTYPES))
+    try:
+        _write_parquet(df, cache_path(path, version))
+        _record(path, version, parts=[[os.path.basename(cache_path(path, version)), len(df)]])
+    except ImportError:
+        # pyarrow is not installed: keep working from the CSV only
+        pass
+    return df
+
+
+def append_rows(rows, path=DATA_FILE):
+    """Append `rows` to the CSV at `path` without rereading it.
+
+    The new fingerprint is derived from the old one and the appended bytes,
+    so neither the file nor its columnar copy is rehashed or reparsed: the
+    copy gains a delta part. Concurrent appends are serialized with
+    dataset_lock(). Raises ValueError, before anything is written, when
+    `rows` lack a column or hold values the SCHEMA cannot read. Returns
+    (old_version, new_version).
+    """
+    with dataset_lock(path):
+        return _append_rows(rows, path)
+
+
+def _append_rows(rows, path):
+    old = file_fingerprint(path)
+    if old is None:
+        raise FileNotFoundError(path)
+    header = list(pd.read_csv(path, nrows=0).columns)
+    missing = [column for column in header if column not in rows.columns]
+    if missing:
+        raise ValueError(f"New records are missing columns: {', '.join(missing)}")
+
+    old_version = _version_of(old)
+    old_parts = _columnar_parts(path, old_version)
+
+    delta = rows[header].to_csv(header=False, index=False).encode()
+    try:
+        # Parse the new lines as the loader will, so rows it could not read are refused before any write
+        parsed = apply_schema(pd.read_csv(io.BytesIO(delta), names=header, dtype=CSV_DTYPES))
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"New records do not match the dataset schema: {error}") from error
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            delta = b"\n" + delta
+    with open(path, "ab") as f:
+        f.write(delta)
+
+    stat = os.stat(path)
+    chained = hashlib.sha256((old["sha256"] + hashlib.sha256(delta).hexdigest()).encode()).hexdigest()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": chained}
+    new_version = _version_of(fingerprint)
+
+    if "store" in old:
+        fingerprint["store"] = old["store"]
+    if old_parts and all(n is not None for _, n in old_parts):
+        try:
+            delta_part = cache_path(path, new_version, "delta.parquet")
+            _write_parquet(parsed, delta_part)
+            fingerprint["parts"] = [[os.path.basename(part), n] for part, n in old_parts + [(delta_part, len(parsed))]]
+        except ImportError:
+            pass
+
+    manifest = _read_manifest()
+    manifest[os.path.abspath(path)] = fingerprint
+    _write_manifest(manifest)
+    return old_version, new_version
+
+
+def _random_category(rng, levels, size):
+    # Built from integer codes so that millions of rows never become Python strings
+    return pd.Categorical.from_codes(rng.integers(0, len(levels), size=size), categories=levels)
+
+
+def make_dummy_data(size=500, seed=0):
+    """Dummy DataFrame with the same 15 columns (and schema) as the real dataset.
+
+    Also used as the synthetic data generator for benchmarks, so it stays
+    cheap at millions of rows.
+    """
+    rng = np.random.default_rng(seed)
+    data = {
+        'Biker_Age': rng.integers(15, 71, size=size, dtype=np.uint8),
+        'Biker_Occupation': _random_category(rng, ['Student', 'Service', 'Business', 'Others'], size),
+        'Biker_Education_Level': _random_category(rng, ['Above high school', 'High school', 'Less than high school'], size),
+        'Riding_Experience': rng.integers(0, 30, size=size).astype(np.float32),
+        'Daily_Travel_Distance': rng.integers(0, 150, size=size, dtype=np.uint16),
+        'Wearing_Helmet': _random_category(rng, ['Yes', 'No'], size),
+        'Bike_Condition': _random_category(rng, ['New', 'Old'], size),
+        'Road_Type': _random_category(rng, ['City Road', 'Highway', 'Village Road'], size),
+        'Road_condition': _random_category(rng, ['Dry', 'Wet'], size),
+        'Weather': _random_category(rng, ['Clear', 'Rainy', 'Foggy'], size),
+        'Time_of_Day': _random_category(rng, ['Morning', 'Noon', 'Afternoon', 'Evening', 'Night'], size),
+        'Traffic_Density': rng.integers(1, 9, size=size, dtype=np.uint8),
+        'Speed_Limit': rng.choice(np.array([40, 45, 50, 55, 60, 70, 75, 80], dtype=np.uint8), size=size),
+        'Bike_Speed': rng.integers(20, 121, size=size, dtype=np.uint8),
+        'Accident_Severity': _random_category(rng, ['No Accident', 'Moderate Accident', 'Severe Accident'], size),
+    }
+    return apply_schema(pd.DataFrame(data))
+
+
+def _rows_since(path, version, start):
+    # Rows `start`.. of dataset `version`, read from the delta parts of its columnar copy (None if unknown)
+    parts = _columnar_parts(path, version)
+    if parts is None or any(n is None for _, n in parts):
+        return None
+    frames, offset = [], 0
+    try:
+        for part, n in parts:
+            if offset + n > start:
+                frames.append(pd.read_parquet(part).iloc[max(start - offset, 0):])
+            offset += n
+    except ImportError:
+        return None
+    if not frames or offset < start:
+        return None
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+
+def _refresh_store(path, version):
+    # Handle of the column store holding `version`: the current store as is, the current
+    # store with the rows appended since it was last refreshed, or a freshly published one
+    fingerprint = file_fingerprint(path)
+    if fingerprint is not None and fingerprint.get("store"):
+        directory = os.path.join(CACHE_DIR, fingerprint["store"])
+        if open_store((directory, version)) is not None:
+            return directory, version
+        latest = latest_store(directory)
+        if latest is not None:
+            delta = _rows_since(path, version, open_store(latest).shape[0])
+            store = None if delta is None else append_store(latest, delta, version)
+            if store is not None:
+                return store
+
+    directory = cache_path(path, version, "store")
+    store = publish_store(read_csv_cached(path, version), directory, version)
+    _record(path, version, store=os.path.basename(directory))
+    return store
+
+
+def _compact_parts(path, version, df):
+    # Replace a long chain of delta parts by one Parquet file written from the store
+    parts = _columnar_parts(path, version)
+    if parts is None or len(parts) <= MAX_PARTS:
+        return
+    target = cache_path(path, version)
+    try:
+        _write_parquet(df, target)
+    except ImportError:
+        return
+    _record(path, version, parts=[[os.path.basename(target), len(df)]])
+
+
+def prune_cache(path=DATA_FILE):
+    """Delete what CACHE_DIR holds for versions of `path` other than the current one.
+
+    Superseded Parquet parts, column stores and saved aggregates go; the
+    current store keeps its few newest versions, for sessions still on them.
+    """
+    with dataset_lock(path):
+        fingerprint = file_fingerprint(path)
+        if fingerprint is None:
+            return
+        version = _version_of(fingerprint)
+        keep = {os.path.basename(part) for part, _ in _columnar_parts(path, version) or []}
+        keep |= {fingerprint.get("store"), os.path.basename(cache_path(path, version, "aggregates.pkl"))}
+        stem = os.path.splitext(os.path.basename(path))[0]
+        derived = re.compile(re.escape(stem) + r"-\d+-[0-9a-f]{16}\.(?!.*\.tmp$).+")
+        for name in os.listdir(CACHE_DIR):
+            if name in keep or not derived.fullmatch(name):
+                continue
+            target = os.path.join(CACHE_DIR, name)
+            if os.path.isdir(target):
+                shutil.rmtree(target, ignore_errors=True)
+            else:
+                try:
+                    os.remove(target)
+                except FileNotFoundError:
+                    pass
+        if fingerprint.get("store"):
+            prune_store(os.path.join(CACHE_DIR, fingerprint["store"]))
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load(path, version):
+    # One read-only, memory-mapped frame per version, shared by every session in this
+    # process and mapping the same pages as other processes (see store.py). After an
+    # append only the new rows are read and written.
+    with dataset_lock(path):
+        df = open_store(_refresh_store(path, version))
+        _compact_parts(path, version, df)
+    prune_cache(path)
+    return df
+
+
+def load_dataset(path=DATA_FILE):
+    """Return (df, version) for a page; version is 'dummy' when the CSV is missing.
+
+    The frame is shared across sessions and must be treated as read-only. The
+    version string is what derived caches (cube, figures, ...) key on.
+    """
+    version = dataset_version(path)
+    if version is None:
+        st.warning(f"Data file '{path}' not found. Using dummy data for demonstration.")
+        return make_dummy_data(), 'dummy'
+    return _load(path, version), version
@@ -0,0 +1,105 @@
+import numpy as np
+import plotly.express as px
+import streamlit as st
+
+from profiling import current_profile
+
+# --- Server-side rasterised density for numeric column pairs ---
+# Points are binned into a fixed grid with one np.bincount (one layer per
+# severity level when colouring), and the grid is shaded into a small RGB
+# image. The browser only ever receives that image, so its cost is the same
+# at 15k or 15M rows; zooming re-bins the visible range at full resolution.
+
+# Grid resolution in pixels (x, y)
+DENSITY_GRID = (240, 160)
+
+# Lightest shade given to a non-empty pixel, so single points stay visible
+MIN_SHADE = 0.25
+
+
+def axis_bins(lo, hi, bins, integer=False):
+    """(start, width, n) of `bins` equal bins over [lo, hi].
+
+    Integer-valued columns get at most one bin per value, centred on the
+    values, so the image does not show empty stripes between them.
+    """
+    if integer:
+        lo, hi = np.floor(lo) - 0.5, np.ceil(hi) + 0.5
+        bins = min(bins, int(hi - lo))
+    if hi <= lo:
+        hi = lo + 1.0
+    return float(lo), (hi - lo) / bins, int(bins)
+
+
+def _bin_index(values, bins):
+    # Bin of each value; as in np.histogram, the last bin also holds its upper edge
+    start, width, n = bins
+    position = (np.asarray(values, dtype=float) - start) / width
+    index = np.floor(position)
+    index[np.isclose(position, n)] = n - 1
+    return index
+
+
+def density_grid(x, y, x_bins, y_bins, groups=None, n_groups=1):
+    """Point counts per grid cell, shape (n_groups, ny, nx); points outside the bins are dropped.
+
+    `x_bins` / `y_bins` are axis_bins() tuples and `groups` optional integer
+    group codes (0..n_groups-1) per point, e.g. the severity level. Points
+    on the upper edge of an axis count in its last bin.
+    """
+    _, _, nx = x_bins
+    _, _, ny = y_bins
+    ix = _bin_index(x, x_bins)
+    iy = _bin_index(y, y_bins)
+    inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+    key = iy[inside].astype(np.intp) * nx + ix[inside].astype(np.intp)
+    if groups is not None:
+        groups = np.asarray(groups)[inside]
+        key = key[groups >= 0] + groups[groups >= 0].astype(np.intp) * (nx * ny)
+    return np.bincount(key, minlength=n_groups * nx * ny).reshape(n_groups, ny, nx)
+
+
+def _shade(total):
+    # Log-scaled darkness in [MIN_SHADE, 1] for non-empty cells, 0 for empty ones
+    top = np.log1p(total.max()) if total.size and total.max() > 0 else 1.0
+    return np.where(total > 0, MIN_SHADE + (1 - MIN_SHADE) * np.log1p(total) / top, 0.0)
+
+
+def _rgb(colors):
+    # Plotly colour strings ('#rrggbb' or 'rgb(r, g, b)') to an (n, 3) float array
+    return np.array([px.colors.unlabel_rgb(px.colors.convert_colors_to_same_type(c, 'rgb')[0][0]) for c in colors], dtype=float)
+
+
+def density_image(counts, colors=None, colorscale='Viridis'):
+    """RGB image (ny, nx, 3, uint8) of a density_grid() result on a white background.
+
+    With one colour per group, each pixel mixes the group colours by their
+    share of its points; otherwise the total is mapped onto `colorscale`.
+    Darkness follows the log of the point count either way.
+    """
+    total = counts.sum(axis=0)
+    shade = _shade(total)
+    if colors is None:
+        lut = _rgb(px.colors.sample_colorscale(colorscale, np.linspace(0, 1, 256)))
+        rgb = lut[np.rint(np.clip((shade - MIN_SHADE) / (1 - MIN_SHADE), 0, 1) * 255).astype(np.intp)]
+        rgb[total == 0] = 255
+        return rgb.astype(np.uint8)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mix = np.tensordot(counts, _rgb(colors), axes=([0], [0])) / total[..., np.newaxis]
+    mix = np.nan_to_num(mix, nan=255.0)
+    return np.rint(255 - shade[..., np.newaxis] * (255 - mix)).astype(np.uint8)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _column_bounds(version, column, _df):
+    values = _df[column].to_numpy(dtype=float)
+    finite = values[~np.isnan(values)]
+    if len(finite) == 0:
+        return 0.0, 1.0, True
+    return float(finite.min()), float(finite.max()), bool(np.all(finite == np.round(finite)))
+
+
+def column_bounds(df, version, column):
+    """(min, max, integer_valued) of a numeric column for dataset `version`."""
+    with current_profile().stage('aggregate'):
+        return _column_bounds(version, column, df)
@@ -0,0 +1,84 @@
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+import streamlit as st
+
+from profiling import current_profile
+
+# --- Shared figure cache ---
+# Finished charts are kept as serialized Plotly JSON, keyed on dataset version,
+# chart id and the active filter state, in one LRU cache shared by every
+# session. A repeat view (or another user on the same view) skips building
+# the figure, running its update_layout calls and serializing it.
+
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class FigureCache:
+    """Thread-safe LRU of figure JSON strings with a total size budget in bytes."""
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return spec
+
+    def put(self, key, spec):
+        size = len(spec)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= len(self._entries.pop(key))
+            self._entries[key] = spec
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def __contains__(self, key):
+        # Peek without touching the LRU order or the hit/miss counters
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """The process-wide FigureCache."""
+    return FigureCache()
+
+
+def cached_figure(view, chart_id, build):
+    """Figure for `chart_id` under the current dataset version and filters, built by `build(view)` on a miss.
+
+    Returns the figure as a plain dict, ready for st.plotly_chart.
+    """
+    profile = current_profile()
+    cache = get_figure_cache()
+    key = (view.version, chart_id, view.state_key)
+    spec = cache.get(key)
+    profile.count("figure_cache_hit" if spec is not None else "figure_cache_miss")
+    if spec is None:
+        with profile.stage("figure build", chart_id):
+            fig = build(view)
+        with profile.stage("serialize", chart_id):
+            spec = pio.to_json(fig, validate=False)
+        cache.put(key, spec)
+    return json.loads(spec)
@@ -0,0 +1,336 @@
+import copy
+import os
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from aggregates import merge_value_histograms, summary_from_histogram, value_histogram
+from cube import CUBE_DIMENSIONS, category_codes, cube_from_keys
+from data import DATA_FILE, load_dataset
+from ingest import DROP_FOLDER, ingest_drop_folder
+from parallel import aggregate_cube, aggregate_rows, encode_rows
+from profiling import current_profile
+from streaming import AggregateView, filter_state_key, load_aggregates, streaming_enabled
+
+# --- Global cross-filter sidebar backed by bitmap indexes ---
+# For each categorical level we keep a packed bitmap (1 bit per row) and for
+# each numeric filter column a sorted index. A filter change is answered with
+# bitwise OR (levels of one column) and AND (across columns) over the packed
+# bitmaps instead of re-evaluating pandas boolean masks over the frame.
+# After an append the new version's index extends the previous one with the
+# appended rows instead of being rebuilt.
+
+NUMERIC_FILTERS = ['Biker_Age', 'Bike_Speed']
+
+# Widget values are copied to these session keys so the selection survives
+# switching pages (widget state itself is dropped when a page is left).
+_STORE_PREFIX = '_filter_store_'
+
+
+class BitmapIndex:
+    """Packed bitmaps per category level plus sorted indexes for numeric columns."""
+
+    def __init__(self, df, dims=None, numeric=None, store=None):
+        self.n_rows = len(df)
+        # Encoding and counting run per partition in the worker pool on large stores (see parallel.py)
+        self.dims, self.levels, self.shape, self.key, self.cube = encode_rows(df, dims or CUBE_DIMENSIONS, store)
+
+        self.bitmaps = {}
+        for axis, dim in enumerate(self.dims):
+            # One dimension's codes at a time, straight from the flat key
+            dim_codes = self.key // int(np.prod(self.shape[axis + 1:])) % self.shape[axis]
+            self.bitmaps[dim] = {level: np.packbits(dim_codes == i) for i, level in enumerate(self.levels[dim])}
+
+        # Sorted values keep the column's dtype; positions are uint32 up to 4G rows
+        position_dtype = np.uint32 if self.n_rows <= np.iinfo(np.uint32).max else np.int64
+        self.sorted = {}
+        for column in (numeric or NUMERIC_FILTERS):
+            if column in df.columns:
+                values = df[column].to_numpy()
+                order = np.argsort(values, kind='stable').astype(position_dtype)
+                self.sorted[column] = (values[order], order)
+        self.histograms = {}
+
+    def extended(self, df):
+        """Index of `df`, whose first n_rows rows are the rows indexed here, built from the rows after them.
+
+        Returns None when those rows bring a category level the index does
+        not have (the cube changes shape, so the index is rebuilt instead).
+        """
+        delta = df.iloc[self.n_rows:]
+        codes = []
+        for dim in self.dims:
+            dim_codes = category_codes(delta[dim], self.levels[dim])
+            if np.any(dim_codes < 0):
+                return None
+            codes.append(dim_codes)
+        key = np.ravel_multi_index(codes, self.shape) if self.dims else np.zeros(len(delta), dtype=np.intp)
+        key = key.astype(self.key.dtype)
+
+        index = copy.copy(self)
+        index.n_rows = len(df)
+        index.key = np.concatenate([self.key, key])
+        index.cube = self.cube.merge(cube_from_keys(self.dims, self.levels, self.shape, key))
+        index.bitmaps = {
+            dim: {level: _extend_bitmap(bitmap, self.n_rows, dim_codes == i)
+                  for i, (level, bitmap) in enumerate(self.bitmaps[dim].items())}
+            for dim, dim_codes in zip(self.dims, codes)
+        }
+        index.sorted = {column: _extend_sorted(*self.sorted[column], delta[column].to_numpy(), self.n_rows)
+                        for column in self.sorted}
+        index.histograms = {column: merge_value_histograms(histogram, value_histogram(delta[column].to_numpy()))
+                            for column, histogram in self.histograms.items()}
+        return index
+
+    def full_histogram(self, df, column, store=None):
+        """Value histogram of a numeric column of the indexed frame `df` over all rows, kept with the index."""
+        if column not in self.histograms:
+            self.histograms[column] = aggregate_rows(df, [column], store)[column]
+        return self.histograms[column]
+
+    def category_bitmap(self, dim, values):
+        """OR of the bitmaps of the selected levels of `dim`."""
+        bitmap = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for value in values:
+            if value in self.bitmaps[dim]:
+                np.bitwise_or(bitmap, self.bitmaps[dim][value], out=bitmap)
+        return bitmap
+
+    def range_bitmap(self, column, low, high):
+        """Bitmap of rows with low <= column <= high, found by binary search on the sorted index."""
+        values, order = self.sorted[column]
+        start, stop = _search(values, low, 'left'), _search(values, high, 'right')
+        rows = np.zeros(self.n_rows, dtype=bool)
+        rows[order[start:stop]] = True
+        return np.packbits(rows)
+
+    def select(self, categories=None, ranges=None):
+        """Packed bitmap of rows matching every filter, or None when nothing is filtered."""
+        bitmap = None
+        parts = [self.category_bitmap(dim, values) for dim, values in (categories or {}).items()]
+        parts += [self.range_bitmap(column, *bounds) for column, bounds in (ranges or {}).items()]
+        for part in parts:
+            bitmap = part if bitmap is None else np.bitwise_and(bitmap, part, out=bitmap)
+        return bitmap
+
+
+def _search(values, bound, side):
+    # np.searchsorted with `bound` in the column's own dtype: a float bound would convert the whole column
+    if np.issubdtype(values.dtype, np.integer):
+        # v >= low is v >= ceil(low), v <= high is v <= floor(high)
+        bound = np.ceil(bound) if side == 'left' else np.floor(bound)
+        info = np.iinfo(values.dtype)
+        if bound < info.min:
+            return 0
+        if bound > info.max:
+            return len(values)
+    return np.searchsorted(values, values.dtype.type(bound), side=side)
+
+
+def _extend_bitmap(bitmap, n_rows, rows):
+    # Packed bitmap of `n_rows` bits followed by the booleans `rows`
+    tail = n_rows % 8
+    if tail == 0:
+        return np.concatenate([bitmap, np.packbits(rows)])
+    head = np.unpackbits(bitmap[-1:], count=tail)
+    return np.concatenate([bitmap[:-1], np.packbits(np.concatenate([head, rows]))])
+
+
+def _extend_sorted(values, order, new_values, offset):
+    # Merge rows offset.. into a sorted index; equal values keep row order, as a stable argsort would
+    new_order = np.argsort(new_values, kind='stable')
+    new_values = new_values[new_order]
+    at = np.searchsorted(values, new_values, side='right')
+    return np.insert(values, at, new_values), np.insert(order, at, new_order + offset)
+
+
+class FilteredView:
+    """What a page needs to draw its charts for the current filter selection."""
+
+    def __init__(self, df, version, index, categories, ranges, store=None):
+        self.df = df
+        self.version = version
+        self.store = store
+        self.index = index
+        self.categories = categories
+        self.ranges = ranges
+        self.state_key = filter_state_key(categories, ranges)
+        self.bitmap = index.select(categories, ranges)
+        self._histograms = {}
+
+    def __contains__(self, column):
+        return column in self.df.columns
+
+    @property
+    def active(self):
+        return self.bitmap is not None
+
+    @cached_property
+    def rows(self):
+        """Boolean row mask (None when no filter is active)."""
+        if self.bitmap is None:
+            return None
+        return np.unpackbits(self.bitmap, count=self.index.n_rows).view(bool)
+
+    @cached_property
+    def cube(self):
+        if self.bitmap is None:
+            return self.index.cube
+        with current_profile().stage('filter cube'):
+            if not self.ranges:
+                # Category-only filters never need to touch the rows: zero out the cube
+                return self.index.cube.restrict(self.categories)
+            return aggregate_cube(self.df, self.index.dims, self.index.levels, self.store, self.bitmap, self.index.key)
+
+    def histogram(self, column):
+        """Value histogram of a numeric column over the selected rows (parallel on large datasets)."""
+        if column not in self._histograms:
+            with current_profile().stage('filter histogram'):
+                if self.bitmap is None:
+                    self._histograms[column] = self.index.full_histogram(self.df, column, self.store)
+                else:
+                    self._histograms[column] = aggregate_rows(self.df, [column], self.store, self.bitmap)[column]
+        return self._histograms[column]
+
+    @property
+    def n_selected(self):
+        return self.index.n_rows if self.bitmap is None else int(self.rows.sum())
+
+    def values(self, column):
+        """Values of `column` for the selected rows."""
+        values = self.df[column].to_numpy()
+        return values if self.bitmap is None else values[self.rows]
+
+    def codes(self, column):
+        """(integer codes, levels) of a categorical column for the selected rows; missing values are -1."""
+        values = self.df[column].array
+        codes = np.asarray(values.codes)
+        return (codes if self.bitmap is None else codes[self.rows]), list(values.categories)
+
+    def numeric_summary(self, column, nbins=20):
+        histogram = self.histogram(column)
+        with current_profile().stage('aggregate'):
+            return summary_from_histogram(*histogram, nbins=nbins)
+
+
+# The latest indexes built, by version, so the index of an appended-to version can extend them
+_recent_indexes = {}
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _index_for_version(version, _df):
+    parent = _recent_indexes.get(_df.attrs.get('parent'))
+    index = None
+    if parent is not None and parent.n_rows == _df.attrs.get('parent_rows'):
+        index = parent.extended(_df)
+    if index is None:
+        index = BitmapIndex(_df, store=_df.attrs.get('store'))
+    _recent_indexes[version] = index
+    while len(_recent_indexes) > 2:
+        _recent_indexes.pop(next(iter(_recent_indexes)))
+    return index
+
+
+def load_index(df, version):
+    """The bitmap index for dataset `version`, shared across sessions."""
+    return _index_for_version(version, df)
+
+
+def persisted_widget(widget, label, key, default, sanitize, store_prefix=_STORE_PREFIX, **kwargs):
+    """Render `widget` so that its value survives switching pages, and return the value.
+
+    The value is copied to session key `store_prefix` + `key` and restored
+    from there when the widget's own state was dropped; `sanitize` fits a
+    stored value to the current options, since the dataset may have changed.
+    """
+    store_key = store_prefix + key
+    if key not in st.session_state:
+        st.session_state[key] = sanitize(st.session_state[store_key]) if store_key in st.session_state else default
+    value = widget(label, key=key, **kwargs)
+    st.session_state[store_key] = value
+    return value
+
+
+def _clear_filters():
+    for key in list(st.session_state.keys()):
+        if key.startswith(_STORE_PREFIX) or key.startswith('filter_'):
+            del st.session_state[key]
+
+
+def _category_filters(levels):
+    categories = {}
+    for dim, dim_levels in levels.items():
+        selected = persisted_widget(
+            st.sidebar.multiselect, dim.replace('_', ' '), f'filter_{dim}', [],
+            lambda stored, options=dim_levels: [v for v in stored if v in options],
+            options=dim_levels,
+        )
+        if selected:
+            categories[dim] = selected
+    return categories
+
+
+def _range_filters(index):
+    ranges = {}
+    for column, (values, _) in index.sorted.items():
+        finite = values[~np.isnan(values)]
+        if len(finite) == 0:
+            continue
+        lo, hi = float(finite[0]), float(finite[-1])
+        if lo == hi:
+            continue
+        low, high = persisted_widget(
+            st.sidebar.slider, column.replace('_', ' '), f'filter_{column}', (lo, hi),
+            lambda stored, lo=lo, hi=hi: (min(max(stored[0], lo), hi), max(min(stored[1], hi), lo)),
+            min_value=lo, max_value=hi, step=1.0 if np.all(finite == np.round(finite)) else None,
+        )
+        if (low, high) != (lo, hi):
+            ranges[column] = (low, high)
+    return ranges
+
+
+def _selection_footer(view, n_rows):
+    st.sidebar.caption(f"{view.n_selected:,} of {n_rows:,} accidents selected")
+    st.sidebar.button("Clear filters", on_click=_clear_filters)
+
+
+def filter_sidebar(df, version, store=None):
+    """Render the shared filter sidebar and return a FilteredView for the selection.
+
+    `store` is the handle of the memory-mapped store `df` came from; it lets aggregation
+    run in worker processes (see parallel.py).
+    """
+    index = load_index(df, version)
+    st.sidebar.header("Filters")
+    categories = _category_filters(index.levels)
+    ranges = _range_filters(index)
+
+    view = FilteredView(df, version, index, categories, ranges, store)
+    _selection_footer(view, index.n_rows)
+    return view
+
+
+def page_view(path=DATA_FILE):
+    """Load the dataset for a page and render the filter sidebar.
+
+    Large files (see streaming.streaming_enabled) are served from streamed
+    aggregates, which support category filters only; everything else is
+    loaded into memory and gets the full bitmap-indexed filters. Records
+    waiting in the drop folder are appended first.
+    """
+    if os.path.isdir(DROP_FOLDER):
+        ingest_drop_folder(DROP_FOLDER, path)
+
+    if streaming_enabled(path):
+        aggregates, version = load_aggregates(path)
+        if aggregates is not None:
+            st.sidebar.header("Filters")
+            view = AggregateView(aggregates, version, _category_filters(aggregates.cube.levels))
+            st.sidebar.caption("Streaming mode: numeric charts show the full dataset and range filters are off.")
+            _selection_footer(view, aggregates.n_rows)
+            return view
+
+    df, version = load_dataset(path)
+    return filter_sidebar(df, version, df.attrs.get('store'))
@@ -1,7 +1,11 @@
+from urllib.error import URLError
+
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 
+from mirror import DATASET_URL, load_remote_csv
+from table import paged_table
+
 
 # --- Corrected Imports ---
 import plotly.graph_objects as go # Keep this if you need go, though px handles everything here
@@ -22,9 +26,15 @@ col2.metric(label="PLO 3", value=f"3.5", help="PLO 3: Digital Skill", border=Tru
 col3.metric(label="PLO 4", value=f"4.0", help="PLO 4: Interpersonal Skill", border=True)
 col4.metric(label="PLO 5", value=f"4.3", help="PLO 5: Communication Skill", border=True)
 
-# Load your data
+# Load your data (served from a local mirror of the remote CSV, revalidated after a TTL;
+# the last downloaded copy is used when GitHub cannot be reached)
 try:
-    df2 = pd.read_csv('https://raw.githubusercontent.com/S23B0121-AqifAddin/assignment1/refs/heads/main/bangladesh_motorbikeaccidents.csv', encoding='utf-8')
-except UnicodeDecodeError:
-    df2 = pd.read_csv('https://raw.githubusercontent.com/S23B0121-AqifAddin/assignment1/refs/heads/main/bangladesh_motorbikeaccidents.csv', encoding='latin-1')
-df2
+    df2, mirror = load_remote_csv(DATASET_URL)
+except URLError:
+    st.error("The remote dataset could not be reached and no local copy has been downloaded yet.")
+    st.stop()
+if mirror["status"] == "offline":
+    st.warning("The remote dataset could not be reached. Showing the last downloaded copy.")
+
+# Only the visible page of rows is sent to the browser (sort/search run server-side)
+paged_table(df2, mirror["sha256"], key="overview")
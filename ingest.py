@@ -0,0 +1,75 @@
+import argparse
+import glob
+import os
+
+import pandas as pd
+
+from data import DATA_FILE, append_rows, dataset_lock
+from streaming import apply_delta
+
+# --- Incremental append of new accident records ---
+# New reports are appended to the dataset and their deltas applied to the
+# cached columnar copy and the saved streaming aggregates; the dataset
+# version changes, so every page picks the new rows up on its next rerun.
+#
+# Either call append_records() directly, run `python ingest.py new.csv`, or
+# drop CSV files into DROP_FOLDER: pages ingest them on their next rerun.
+
+DROP_FOLDER = "incoming"
+
+
+def append_records(rows, path=DATA_FILE):
+    """Append the DataFrame `rows` to the dataset at `path` and return the new dataset version."""
+    # One lock around both steps, so the saved aggregates follow the same order of appends
+    with dataset_lock(path):
+        old_version, new_version = append_rows(rows, path)
+        apply_delta(path, old_version, new_version, rows)
+    return new_version
+
+
+def _move(file, folder):
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(folder, os.path.basename(file))
+    os.replace(file, target)
+    return target
+
+
+def ingest_drop_folder(folder=DROP_FOLDER, path=DATA_FILE):
+    """Append every CSV waiting in `folder`, oldest name first; returns the files ingested.
+
+    Each file is first moved to `folder`/processed, which claims it, so two
+    sessions never ingest the same file twice. Files that do not match the
+    dataset's columns or schema go to `folder`/failed.
+    """
+    ingested = []
+    for file in sorted(glob.glob(os.path.join(folder, "*.csv"))):
+        try:
+            claimed = _move(file, os.path.join(folder, "processed"))
+        except FileNotFoundError:
+            continue  # another session got there first
+        try:
+            append_records(pd.read_csv(claimed), path)
+        except (ValueError, pd.errors.ParserError):
+            _move(claimed, os.path.join(folder, "failed"))
+            continue
+        ingested.append(claimed)
+    return ingested
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append new accident records to the dataset.")
+    parser.add_argument("files", nargs="*", help=f"CSV files to append (default: everything in {DROP_FOLDER}/)")
+    parser.add_argument("--data", default=DATA_FILE, help="dataset CSV to append to")
+    args = parser.parse_args()
+
+    if not args.files:
+        for file in ingest_drop_folder(path=args.data):
+            print(f"ingested {file}")
+        return
+    for file in args.files:
+        version = append_records(pd.read_csv(file), args.data)
+        print(f"ingested {file} -> dataset version {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
 import streamlit as st
 
+from warmup import start_warm_up
+
 st.set_page_config(page_title="Bangladesh Motorbike Accident")
 
+# Load the data, build the page aggregates and pre-render every chart in the
+# background, once per server process (see warmup.py)
+start_warm_up()
+
 # Define each page
 page_1 = st.Page("page1.py", title="Page 1")
 page_2 = st.Page("page2.py", title="Page 2")
 page_3 = st.Page("page3.py", title="Page 3")
+page_4 = st.Page("page4.py", title="Severity Risk")
+page_5 = st.Page("page5.py", title="Speed Density")
 
 # Create navigation menu
 pg = st.navigation(
     {
-        "Menu": [page_1, page_2, page_3]
+        "Menu": [page_1, page_2, page_3, page_4, page_5]
     }
 )
 
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import streamlit as st
+
+from data import CACHE_DIR
+
+# --- Offline mirror for the remote dataset used by home.py / home1.py ---
+# The remote CSV is downloaded once into MIRROR_DIR. Within MIRROR_TTL_SECONDS
+# the local copy is used without touching the network; after that it is
+# revalidated with a conditional GET (ETag / Last-Modified), so an unchanged
+# file costs one 304 response. The encoding is detected once per download.
+# When the source cannot be reached the last good copy keeps being served,
+# and the source is not tried again for OFFLINE_RETRY_SECONDS.
+
+DATASET_URL = 'https://raw.githubusercontent.com/S23B0121-AqifAddin/assignment1/refs/heads/main/bangladesh_motorbikeaccidents.csv'
+MIRROR_DIR = os.path.join(CACHE_DIR, "mirror")
+MIRROR_TTL_SECONDS = 300
+OFFLINE_RETRY_SECONDS = 60
+REQUEST_TIMEOUT_SECONDS = 10
+
+
+def _mirror_paths(url, mirror_dir):
+    name = hashlib.sha256(url.encode()).hexdigest()[:16]
+    return os.path.join(mirror_dir, f"{name}.csv"), os.path.join(mirror_dir, f"{name}.json")
+
+
+def _detect_encoding(body):
+    try:
+        body.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _write_atomic(target, data, mode="wb"):
+    tmp = target + f".{os.getpid()}.tmp"
+    with open(tmp, mode) as f:
+        f.write(data)
+    os.replace(tmp, target)
+
+
+def _offline(csv_path, meta_path, meta, now):
+    # Serve the previous copy and remember the failed check, so reruns back off instead of waiting on the source
+    meta = dict(meta, failed_at=now)
+    _write_atomic(meta_path, json.dumps(meta), mode="w")
+    return csv_path, dict(meta, status="offline")
+
+
+def refresh_mirror(url=DATASET_URL, mirror_dir=MIRROR_DIR, ttl=MIRROR_TTL_SECONDS, timeout=REQUEST_TIMEOUT_SECONDS,
+                   retry=OFFLINE_RETRY_SECONDS):
+    """Bring the local mirror of `url` up to date and return (csv_path, meta).
+
+    meta['status'] is 'cached' (within the TTL), 'not-modified', 'downloaded'
+    or 'offline' (source unreachable, previous copy served; the source is
+    then left alone for `retry` seconds). Raises
+    urllib.error.URLError only when the source is unreachable and there is
+    no local copy yet.
+    """
+    csv_path, meta_path = _mirror_paths(url, mirror_dir)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        meta = None
+    if meta is not None and not os.path.exists(csv_path):
+        meta = None
+
+    now = time.time()
+    if meta is not None and now - meta["checked_at"] < ttl:
+        return csv_path, dict(meta, status="cached")
+    if meta is not None and now - meta.get("failed_at", -retry) < retry:
+        return csv_path, dict(meta, status="offline")
+
+    request = urllib.request.Request(url)
+    if meta is not None:
+        if meta.get("etag"):
+            request.add_header("If-None-Match", meta["etag"])
+        if meta.get("last_modified"):
+            request.add_header("If-Modified-Since", meta["last_modified"])
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            headers = response.headers
+        status = "downloaded"
+    except urllib.error.HTTPError as error:
+        if error.code == 304 and meta is not None:
+            body, headers, status = None, error.headers, "not-modified"
+        elif meta is not None:
+            return _offline(csv_path, meta_path, meta, now)
+        else:
+            raise
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as error:
+        if meta is None:
+            # A timeout or reset while reading the response is not wrapped by urlopen itself
+            if isinstance(error, urllib.error.URLError):
+                raise
+            raise urllib.error.URLError(error) from error
+        return _offline(csv_path, meta_path, meta, now)
+
+    os.makedirs(mirror_dir, exist_ok=True)
+    if body is not None:
+        _write_atomic(csv_path, body)
+        meta = {
+            "url": url,
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "encoding": _detect_encoding(body),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+    meta["checked_at"] = now
+    meta.pop("failed_at", None)
+    _write_atomic(meta_path, json.dumps(meta), mode="w")
+    return csv_path, dict(meta, status=status)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _read_mirror(csv_path, sha256, encoding):
+    # Shared (read-only) across sessions rather than copied into each one
+    return pd.read_csv(csv_path, encoding=encoding)
+
+
+def load_remote_csv(url=DATASET_URL, **kwargs):
+    """(DataFrame, meta) for the remote CSV at `url`, served from the local mirror."""
+    csv_path, meta = refresh_mirror(url, **kwargs)
+    return _read_mirror(csv_path, meta["sha256"], meta["encoding"]), meta
@@ -1,29 +1,17 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import plotly.express as px
 
-# --- Data Loading (Crucial for the app to run) ---
-# Use st.cache_data for efficiency if the dataframe is large
-@st.cache_data
-def load_data():
-    try:
-        # Attempt to load the real data
-        # NOTE: Update 'your_data.csv' to the actual filename if needed
-        df = pd.read_csv("motorbike_accident_severity.csv")
-        return df
-    except FileNotFoundError:
-        # Create a dummy DataFrame if the file isn't found
-        st.warning("Data file not found. Using dummy data for demonstration.")
-        size = 200
-        data = {
-            'Weather': np.random.choice(['Clear', 'Raining', 'Fog', 'Snowing', 'Windy', 'Overcast'], size=size),
-            'Accident_Severity': np.random.choice(['Slight', 'Serious', 'Fatal'], size=size),
-            'Time_of_Day': np.random.choice(['Morning (6-12)', 'Afternoon (12-18)', 'Evening (18-24)', 'Night (0-6)'], size=size),
-        }
-        return pd.DataFrame(data)
-
-df = load_data()
+from charts import stacked_count_bar
+from filters import page_view
+from profiling import start_profile
+from progressive import ProgressiveRenderer
+
+# --- Data Loading (shared, cached loader from data.py) ---
+# Also renders the shared filter sidebar; all counts below come from the (filtered) category cube
+profile = start_profile('page2')
+with profile.stage('load'):
+    view = page_view()
+progressive = ProgressiveRenderer(view, profile)
 
 # --- Streamlit Application ---
 
@@ -35,26 +23,28 @@ st.header("1. Weather of Day Analysis")
 summary_text = "Accidents peak significantly during the Afternoon time segment. Night has the second-highest count, while Morning, Noon, and Evening have lower, but roughly equal, frequencies. This clearly identifies the Afternoon as the most dangerous period for bikers, likely correlating with high traffic volume (e.g., afternoon commute)"
 st.info(summary_text)
 
-if 'Weather' in df.columns:
-    weather_counts = df['Weather'].value_counts().reset_index()
-    weather_counts.columns = ['Weather Condition', 'Count'] 
-
-    fig_weather = px.bar(
-        weather_counts,
-        x='Weather Condition',
-        y='Count',
-        title='Distribution of Weather Conditions during Accidents',
-        color='Weather Condition', 
-        color_discrete_sequence=px.colors.qualitative.D3
-    )
-
-    fig_weather.update_layout(
-        xaxis_title='Weather Condition',
-        yaxis_title='Count',
-        xaxis_tickangle=-45
-    )
-
-    st.plotly_chart(fig_weather, use_container_width=True)
+if 'Weather' in view:
+    def build_weather_chart(view):
+        weather_counts = view.cube.count('Weather').rename(columns={'Weather': 'Weather Condition'})
+
+        fig_weather = px.bar(
+            weather_counts,
+            x='Weather Condition',
+            y='Count',
+            error_y=weather_counts.get('Error'),  # sample error bars (approximate mode only)
+            title='Distribution of Weather Conditions during Accidents',
+            color='Weather Condition', 
+            color_discrete_sequence=px.colors.qualitative.D3
+        )
+
+        fig_weather.update_layout(
+            xaxis_title='Weather Condition',
+            yaxis_title='Count',
+            xaxis_tickangle=-45
+        )
+        return fig_weather
+
+    progressive.chart('page2_weather', build_weather_chart)
 
 else:
     st.error("The DataFrame does not contain a 'Weather' column.")
@@ -64,26 +54,28 @@ st.header("2. Time of Day Analysis")
 summary_text_time = "The highest total number of accidents occur during Clear weather, with Rainy and Foggy conditions having a slightly lower but comparable count. Similar to the road condition analysis, this indicates that the majority of accidents happen under seemingly ideal (clear) conditions, which may be due to higher traffic, speeding, or overconfidence, rather than weather-related impairment."
 st.info(summary_text_time)
 
-if 'Time_of_Day' in df.columns:
-    time_counts = df['Time_of_Day'].value_counts().reset_index()
-    time_counts.columns = ['Time of Day', 'Count']
-
-    fig_time = px.bar(
-        time_counts,
-        x='Time of Day',
-        y='Count',
-        title='Distribution of Accidents by Time of Day',
-        color='Time of Day', 
-        color_discrete_sequence=px.colors.qualitative.Prism
-    )
-
-    fig_time.update_layout(
-        xaxis_title='Time of Day',
-        yaxis_title='Count of Accidents',
-        xaxis_tickangle=-45
-    )
-
-    st.plotly_chart(fig_time, use_container_width=True)
+if 'Time_of_Day' in view:
+    def build_time_chart(view):
+        time_counts = view.cube.count('Time_of_Day').rename(columns={'Time_of_Day': 'Time of Day'})
+
+        fig_time = px.bar(
+            time_counts,
+            x='Time of Day',
+            y='Count',
+            error_y=time_counts.get('Error'),  # sample error bars (approximate mode only)
+            title='Distribution of Accidents by Time of Day',
+            color='Time of Day', 
+            color_discrete_sequence=px.colors.qualitative.Prism
+        )
+
+        fig_time.update_layout(
+            xaxis_title='Time of Day',
+            yaxis_title='Count of Accidents',
+            xaxis_tickangle=-45
+        )
+        return fig_time
+
+    progressive.chart('page2_time', build_time_chart)
 
 else:
     st.error("The DataFrame does not contain a 'Time_of_Day' column. Please check your data file.")
@@ -93,34 +85,38 @@ st.header("3. Relationship between Weather and Accident Severity")
 summary_text_severity = "The proportion of the most severe accidents ('No Accident' and 'Severe Accident' seem to be the severe categories based on the legend colors: Yellow and Green, or perhaps Severe Accident and Moderate Accident are the non-minor categories). Assuming the top two colors are the most severe: The proportions of severe accidents appear relatively consistent across Clear, Rainy, and Foggy weather. This suggests that while Rainy and Foggy weather are hazardous, the severity of an accident, once it occurs, is not drastically different compared to Clear conditions."
 st.info(summary_text_severity)
 
-if 'Weather' in df.columns and 'Accident_Severity' in df.columns:
-
-    # Use Plotly Express's histogram function to automatically count and stack the data
-    fig_severity = px.histogram(
-        df,
-        x='Weather',
-        color='Accident_Severity',
-        barmode='stack', # Key setting for a stacked bar chart
-        title='Accident Severity by Weather Condition (Stacked)',
-        labels={'Weather': 'Weather Condition', 'count': 'Number of Accidents'},
-        # Order the severity levels logically for the legend
-        category_orders={"Accident_Severity": ['Slight', 'Serious', 'Fatal']},
-        color_discrete_sequence=px.colors.qualitative.T10 # Using a standard Plotly palette
-    )
-
-    # Customize layout and axis labels
-    fig_severity.update_layout(
-        xaxis_title='Weather Condition',
-        yaxis_title='Number of Accidents (Count)',
-        xaxis_tickangle=-45,
-        legend_title="Severity"
-    )
+if 'Weather' in view and 'Accident_Severity' in view:
+    def build_severity_chart(view):
+        # Two-way counts come from the cube and are stacked with a bar chart (no raw rows in the figure)
+        fig_severity = stacked_count_bar(
+            view.cube.count('Weather', 'Accident_Severity'),
+            x='Weather',
+            color='Accident_Severity',
+            title='Accident Severity by Weather Condition (Stacked)',
+            labels={'Weather': 'Weather Condition', 'Count': 'Number of Accidents'},
+            # Order the severity levels logically for the legend
+            category_orders={"Accident_Severity": ['Slight', 'Serious', 'Fatal']},
+            color_discrete_sequence=px.colors.qualitative.T10 # Using a standard Plotly palette
+        )
+
+        # Customize layout and axis labels
+        fig_severity.update_layout(
+            xaxis_title='Weather Condition',
+            yaxis_title='Number of Accidents (Count)',
+            xaxis_tickangle=-45,
+            legend_title="Severity"
+        )
     
-    # Ensure all bars are clearly visible (e.g., sort by total count descending)
-    fig_severity.update_xaxes(categoryorder='total descending')
+        # Ensure all bars are clearly visible (e.g., sort by total count descending)
+        fig_severity.update_xaxes(categoryorder='total descending')
+        return fig_severity
 
     # Display the Plotly chart in Streamlit
-    st.plotly_chart(fig_severity, use_container_width=True)
+    progressive.chart('page2_severity', build_severity_chart)
     
 else:
     st.error("DataFrame must contain 'Weather' and 'Accident_Severity' columns.")
+
+# --- Exact charts replace any approximate ones; timings (sidebar panel / structured log) ---
+progressive.finish()
+profile.finish()
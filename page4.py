@@ -0,0 +1,86 @@
+import streamlit as st
+
+from charts import rate_with_interval
+from figure_cache import cached_figure
+from filters import page_view
+from profiling import start_profile
+from risk import OUTCOME, RISK_FACTORS, SEVERE_LEVEL, chi_square_tests, most_dangerous, severity_rates
+
+# --- Data Loading (shared, cached loader from data.py) ---
+# Also renders the shared filter sidebar; every statistic below comes from the (filtered) category cube
+profile = start_profile('page4')
+with profile.stage('load'):
+    view = page_view()
+
+# --- Streamlit Application ---
+st.subheader("Objective : To measure which road, weather, time and rider conditions make an accident more likely to be severe, rather than just more frequent.")
+summary_text = "The other pages count accidents; this page compares how often an accident under each condition ends up as a Severe Accident. The bars show the share of severe accidents for every level of the chosen factor with a 95% confidence interval, against the share over all selected accidents. The chi-square table tests whether the severity depends on each factor at all, and the ranking lists the single conditions and pairs of conditions with the highest share of severe accidents. All figures follow the sidebar filters."
+st.info(summary_text)
+
+if OUTCOME in view and SEVERE_LEVEL in view.cube.levels[OUTCOME]:
+    cube = view.cube
+    severity_counts = cube.count(OUTCOME).set_index(OUTCOME)['Count']
+    overall_rate = severity_counts.get(SEVERE_LEVEL, 0) / max(int(severity_counts.sum()), 1)
+    factors = [factor for factor in RISK_FACTORS if factor in cube]
+
+    # --- 1. Severe accident rate per level of a factor ---
+    st.header("1. Severe Accident Rate by Condition")
+    factor = st.selectbox("Factor", factors, format_func=lambda name: name.replace('_', ' '), key='risk_factor')
+
+    def build_rate_chart(view):
+        with profile.stage('risk statistics'):
+            rates = severity_rates(view.cube, [(factor,)])
+        return rate_with_interval(
+            rates,
+            x=factor.replace('_', ' '),
+            title=f"Share of Severe Accidents by {factor.replace('_', ' ')} (95% CI)",
+            reference=overall_rate,
+        )
+
+    with profile.stage('render', f'page4_rate_{factor}'):
+        st.plotly_chart(cached_figure(view, f'page4_rate_{factor}', build_rate_chart), use_container_width=True)
+
+    # --- 2. Association tests ---
+    st.header("2. Does Severity Depend on the Factor?")
+    with profile.stage('risk statistics', 'page4_tests'):
+        tests = chi_square_tests(cube, factors)
+    st.dataframe(
+        tests.sort_values('cramers_v', ascending=False),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'factor': 'Factor',
+            'chi2': st.column_config.NumberColumn('Chi-square', format='%.1f'),
+            'dof': 'Degrees of freedom',
+            'p_value': st.column_config.NumberColumn('p-value', format='%.2e'),
+            'cramers_v': st.column_config.NumberColumn("Cramér's V", format='%.3f'),
+        },
+    )
+
+    # --- 3. Most dangerous conditions ---
+    st.header("3. Most Dangerous Conditions")
+    min_accidents = st.number_input("Minimum accidents per condition", min_value=1, value=50, step=10, key='risk_min_accidents')
+    with profile.stage('render', 'page4_ranking'):
+        ranking = most_dangerous(cube, factors, min_accidents=int(min_accidents), top=15)
+        st.dataframe(
+            ranking.drop(columns=['rr_low', 'rr_high']),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'factor': 'Factor(s)',
+                'condition': 'Condition',
+                'accidents': 'Accidents',
+                'severe': 'Severe',
+                'rate': st.column_config.NumberColumn('Severe share', format='percent'),
+                'rate_low': st.column_config.NumberColumn('95% CI low', format='percent'),
+                'rate_high': st.column_config.NumberColumn('95% CI high', format='percent'),
+                'relative_risk': st.column_config.NumberColumn('Relative risk', format='%.2f'),
+            },
+        )
+    st.caption("Ranked on the lower end of the confidence interval, so well-supported conditions come first. Relative risk compares a condition with the other conditions of the same factor(s).")
+
+else:
+    st.error(f"The DataFrame must contain an '{OUTCOME}' column with '{SEVERE_LEVEL}' records.")
+
+# --- Timings (sidebar panel / structured log) ---
+profile.finish()
@@ -0,0 +1,110 @@
+import streamlit as st
+import plotly.express as px
+
+from charts import density_raster
+from density import DENSITY_GRID, axis_bins, column_bounds, density_grid, density_image
+from figure_cache import cached_figure
+from filters import page_view
+from profiling import start_profile
+
+# --- Data Loading (shared, cached loader from data.py) ---
+# Also renders the shared filter sidebar; the density is binned from the selected rows
+profile = start_profile('page5')
+with profile.stage('load'):
+    view = page_view()
+
+# --- Streamlit Application ---
+st.subheader("Objective : To show how riding speed relates to the posted speed limit and to the rider's age, and where the severe accidents sit in that space.")
+summary_text = "Each pixel counts the accidents falling in a small range of both measures; darker pixels hold more accidents (log scale). Colouring by severity mixes the severity colours by their share of the pixel, so clusters of severe accidents stand out. Drag a box on the chart to zoom: the selected range is re-binned at full resolution. The chart is an image computed on the server, so it stays light whatever the number of accidents."
+st.info(summary_text)
+
+NUMERIC_AXES = ['Speed_Limit', 'Biker_Age', 'Riding_Experience', 'Daily_Travel_Distance', 'Traffic_Density', 'Bike_Speed']
+SEVERITY_COLORS = px.colors.qualitative.T10
+
+
+def _range_key(column):
+    return f'density_range_{column}'
+
+
+def _zoom_to_selection():
+    # Box selection on the chart: narrow the range sliders of both axes to the box
+    boxes = st.session_state['density_chart'].selection.get('box') or []
+    if boxes:
+        box = boxes[-1]
+        for axis, column in (('x', st.session_state['density_x']), ('y', st.session_state['density_y'])):
+            low, high = sorted(box[axis][:2])
+            st.session_state[_range_key(column)] = (low, high)
+
+
+def _reset_zoom():
+    for key in list(st.session_state.keys()):
+        if key.startswith('density_range_'):
+            del st.session_state[key]
+
+
+if not hasattr(view, 'values'):
+    st.info("The density view needs the rows in memory, so it is not available in streaming mode.")
+else:
+    axes = [column for column in NUMERIC_AXES if column in view]
+    if len(axes) < 2:
+        st.error("The DataFrame needs at least two numeric columns for the density view.")
+    else:
+        col_x, col_y, col_color = st.columns(3)
+        x = col_x.selectbox("X axis", axes, index=0, format_func=lambda name: name.replace('_', ' '), key='density_x')
+        y = col_y.selectbox("Y axis", [c for c in axes if c != x], index=len([c for c in axes if c != x]) - 1,
+                            format_func=lambda name: name.replace('_', ' '), key='density_y')
+        by_severity = col_color.toggle("Colour by severity", value=True, key='density_by_severity',
+                                       disabled='Accident_Severity' not in view)
+        by_severity = by_severity and 'Accident_Severity' in view
+
+        # Zoom: one range per column, narrowed by box selection on the chart
+        bounds = {}
+        for column in (x, y):
+            lo, hi, integer = column_bounds(view.df, view.version, column)
+            low, high = st.session_state.get(_range_key(column), (lo, hi))
+            # Clamp a stored zoom to the current data (the dataset may have changed)
+            st.session_state[_range_key(column)] = (min(max(low, lo), hi), max(min(high, hi), lo))
+            bounds[column] = (integer, st.sidebar.slider(
+                f"{column.replace('_', ' ')} range", min_value=lo, max_value=hi, key=_range_key(column),
+                step=1.0 if integer else None,
+            ))
+        st.sidebar.button("Reset zoom", on_click=_reset_zoom)
+
+        x_integer, (x_low, x_high) = bounds[x]
+        y_integer, (y_low, y_high) = bounds[y]
+
+        def build_density_chart(view):
+            x_bins = axis_bins(x_low, x_high, DENSITY_GRID[0], x_integer)
+            y_bins = axis_bins(y_low, y_high, DENSITY_GRID[1], y_integer)
+            with profile.stage('aggregate'):
+                if by_severity:
+                    codes, levels = view.codes('Accident_Severity')
+                    counts = density_grid(view.values(x), view.values(y), x_bins, y_bins,
+                                          groups=codes, n_groups=len(levels))
+                else:
+                    counts = density_grid(view.values(x), view.values(y), x_bins, y_bins)
+            with profile.stage('rasterise'):
+                colors = [SEVERITY_COLORS[i % len(SEVERITY_COLORS)] for i in range(len(counts))] if by_severity else None
+                image = density_image(counts, colors)
+            return density_raster(
+                image, x_bins, y_bins,
+                title=f"{y.replace('_', ' ')} vs {x.replace('_', ' ')} ({int(counts.sum()):,} accidents in view)",
+                x_label=x.replace('_', ' '),
+                y_label=y.replace('_', ' '),
+                legend=list(zip(levels, colors)) if by_severity else None,
+                max_count=int(counts.sum(axis=0).max()),
+            )
+
+        chart_id = f'page5_density_{x}_{y}_{x_low}_{x_high}_{y_low}_{y_high}_{by_severity}'
+        with profile.stage('render', chart_id):
+            st.plotly_chart(
+                cached_figure(view, chart_id, build_density_chart),
+                use_container_width=True,
+                key='density_chart',
+                on_select=_zoom_to_selection,
+                selection_mode='box',
+            )
+        st.caption("Drag a box to zoom into it; use the range sliders or 'Reset zoom' in the sidebar to go back.")
+
+# --- Timings (sidebar panel / structured log) ---
+profile.finish()
@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, reduce
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from aggregates import merge_value_histograms, value_histogram
+from cube import CategoryCube, build_cube, cube_from_keys, encode_categories
+from store import open_store
+
+# --- Multi-core aggregation engine ---
+# The rows are split into contiguous partitions and each worker process
+# aggregates its partition: value histograms of numeric columns, and the
+# category cube (encoding the rows into flat cube keys and counting them with
+# np.bincount, optionally over the filtered rows only). The partial results
+# are then merged (merge_value_histograms, CategoryCube.merge). Workers open
+# the shared memory-mapped store themselves (see store.py), so only the
+# partition bounds, the column names / levels and, when filtering, that
+# partition's slice of the packed row bitmap are sent to them - never the rows.
+
+# Worker processes used for aggregation; ACCIDENT_WORKERS overrides (1 disables the pool)
+AGGREGATION_WORKERS = int(os.environ.get("ACCIDENT_WORKERS", os.cpu_count() or 1))
+
+# Below this many rows the pool overhead outweighs the gain and aggregation runs in-process
+PARALLEL_MIN_ROWS = 1_000_000
+
+
+def _histograms(df, mask, columns):
+    # Only the requested columns are read (and masked); the frame itself is never copied
+    histograms = {}
+    for column in columns:
+        values = df[column].to_numpy()
+        histograms[column] = value_histogram(values if mask is None else values[mask])
+    return histograms
+
+
+def _cube(df, mask, dims, levels, with_key):
+    # (cube, flat keys or None) of the selected rows. Without `levels` the partition finds its own
+    # levels (all rows); with them, keys and cubes of different partitions line up
+    if levels is None:
+        return build_cube(df, dims), None
+    dims, levels, shape, key = encode_categories(df, dims, levels)
+    if mask is not None:
+        key = key[mask]
+    return cube_from_keys(dims, levels, shape, key), (key if with_key else None)
+
+
+@lru_cache(maxsize=4)
+def _worker_store(store):
+    return open_store(store)
+
+
+def _run_partition(function, store, start, stop, bitmap, *args):
+    # Runs in a worker process. `start` is a multiple of 8, so `bitmap` is byte-aligned to it
+    rows = _worker_store(store).iloc[start:stop]
+    mask = None if bitmap is None else np.unpackbits(bitmap, count=stop - start).view(bool)
+    return function(rows, mask, *args)
+
+
+@st.cache_resource(show_spinner=False)
+def _pool(workers):
+    # "spawn" rather than fork: forking the threaded Streamlit server is not safe
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _uses_pool(df, store, workers):
+    return store is not None and workers > 1 and len(df) >= PARALLEL_MIN_ROWS
+
+
+def _partials(function, df, store, bitmap, workers, *args):
+    # [function(rows, mask, *args)] over the whole frame in this process, or one per partition in the pool
+    n_rows = len(df)
+    if not _uses_pool(df, store, workers):
+        mask = None if bitmap is None else np.unpackbits(bitmap, count=n_rows).view(bool)
+        return [function(df, mask, *args)]
+
+    # Partition bounds on multiples of 8 rows, so each bitmap slice is whole bytes
+    size = -(-n_rows // workers)
+    size += -size % 8
+    bounds = [(start, min(start + size, n_rows)) for start in range(0, n_rows, size)]
+    futures = [
+        _pool(workers).submit(
+            _run_partition, function, store, start, stop,
+            None if bitmap is None else bitmap[start // 8:(stop + 7) // 8], *args,
+        )
+        for start, stop in bounds
+    ]
+    return [future.result() for future in futures]
+
+
+def aggregate_rows(df, columns, store=None, bitmap=None, workers=None):
+    """{column: value histogram} over the rows of `df` selected by the packed `bitmap` (all if None).
+
+    `store` is the handle of the memory-mapped store `df` was opened from.
+    Without one, or for small frames, aggregation runs in this process.
+    """
+    columns = list(columns)
+    partials = _partials(_histograms, df, store, bitmap, workers or AGGREGATION_WORKERS, columns)
+    return {column: merge_value_histograms(*(partial[column] for partial in partials)) for column in columns}
+
+
+def aggregate_cube(df, dims, levels, store=None, bitmap=None, key=None, workers=None):
+    """CategoryCube over `levels` of the rows of `df` selected by the packed `bitmap` (all if None).
+
+    `key` (the rows' flat cube keys, if already known) is used instead of
+    encoding the rows again when aggregation runs in this process.
+    """
+    workers = workers or AGGREGATION_WORKERS
+    if key is not None and not _uses_pool(df, store, workers):
+        shape = tuple(len(levels[dim]) + 1 for dim in dims)
+        if bitmap is not None:
+            key = key[np.unpackbits(bitmap, count=len(df)).view(bool)]
+        return cube_from_keys(dims, levels, shape, key)
+    partials = _partials(_cube, df, store, bitmap, workers, dims, levels, False)
+    return reduce(CategoryCube.merge, (cube for cube, _ in partials))
+
+
+def encode_rows(df, dims, store=None, workers=None):
+    """encode_categories() of `df` plus its cube: (dims, levels, shape, key, cube), per partition in the pool.
+
+    The partitions' cubes (each with its own levels) are merged to find the
+    levels; the rows are then encoded against those, in level order as
+    encode_categories() would give them.
+    """
+    workers = workers or AGGREGATION_WORKERS
+    if not _uses_pool(df, store, workers):
+        dims, levels, shape, key = encode_categories(df, dims)
+        return dims, levels, shape, key, cube_from_keys(dims, levels, shape, key)
+
+    dims = [dim for dim in dims if dim in df.columns]
+    found = reduce(CategoryCube.merge, (cube for cube, _ in _partials(_cube, df, store, None, workers, dims, None, False)))
+    levels = {}
+    for dim in dims:
+        categorical = isinstance(df[dim].dtype, pd.CategoricalDtype)
+        order = df[dim].cat.categories if categorical else sorted(found.levels[dim])
+        levels[dim] = [level for level in order if level in found.levels[dim]]
+
+    partials = _partials(_cube, df, store, None, workers, dims, levels, True)
+    shape = tuple(len(levels[dim]) + 1 for dim in dims)
+    key = np.concatenate([key for _, key in partials])
+    return dims, levels, shape, key, reduce(CategoryCube.merge, (cube for cube, _ in partials))
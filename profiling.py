@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+# --- Per-run profiling hooks ---
+# Each page starts a PageProfile and wraps its stages (load, aggregate,
+# figure build, serialize, render) in profile.stage(). Stage times are
+# "self" times: time spent in nested stages is reported under those stages.
+# At the end of the run the stages are emitted as one JSON log line each on
+# the "accident.profile" logger (enabled with ACCIDENT_PROFILE_LOG=1) and,
+# when switched on in the sidebar, shown in a timing panel.
+
+logger = logging.getLogger('accident.profile')
+if os.environ.get('ACCIDENT_PROFILE_LOG') == '1':
+    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+else:
+    # Off unless asked for, even when the root logger is at INFO or below
+    logger.setLevel(logging.WARNING)
+
+_local = threading.local()
+
+
+def _rss_bytes():
+    # Current resident set size (Linux); None where /proc is not available.
+    # RSS is per process, so concurrent sessions show up in each other's deltas.
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PageProfile:
+    """Timings, memory deltas and cache counters for one run of one page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.records = []
+        self.counters = {}
+        self._stack = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, chart=None):
+        # Stages nested in a chart's stage (e.g. aggregation inside its figure build) belong to that chart
+        if chart is None and self._stack:
+            chart = self._stack[-1]['chart']
+        frame = {'chart': chart, 'children': 0.0}
+        self._stack.append(frame)
+        rss = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]['children'] += total
+            rss_after = _rss_bytes()
+            self.records.append({
+                'page': self.page,
+                'chart': chart,
+                'stage': name,
+                'ms': round((total - frame['children']) * 1000, 2),
+                'rss_delta_mb': None if rss is None or rss_after is None else round((rss_after - rss) / 2**20, 2),
+            })
+
+    def count(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def absorb(self, other):
+        """Add the stages and counters of a profile taken on another thread for the same run."""
+        self.records.extend(other.records)
+        for counter, n in other.counters.items():
+            self.count(counter, n)
+
+    def finish(self):
+        """Log the run and draw the sidebar panel if it is switched on."""
+        total_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        if logger.isEnabledFor(logging.INFO):
+            for record in self.records:
+                logger.info(json.dumps(record))
+            logger.info(json.dumps({'page': self.page, 'stage': 'total', 'ms': total_ms, 'counters': self.counters}))
+        if st.sidebar.toggle("Show performance panel", key='profile_panel'):
+            _panel(self, total_ms)
+
+
+def _panel(profile, total_ms):
+    from figure_cache import get_figure_cache
+
+    with st.sidebar.expander("Performance", expanded=True):
+        st.caption(f"Page run: {total_ms:,.0f} ms")
+        if profile.records:
+            table = pd.DataFrame(profile.records).drop(columns='page').fillna({'chart': ''})
+            st.dataframe(table.sort_values('ms', ascending=False), hide_index=True, use_container_width=True)
+        cache = get_figure_cache()
+        st.caption(
+            f"Figure cache this run: {profile.counters.get('figure_cache_hit', 0)} hits, "
+            f"{profile.counters.get('figure_cache_miss', 0)} misses. "
+            f"Process: {cache.hits} hits, {cache.misses} misses, {len(cache)} figures, {cache.bytes / 2**20:.1f} MB."
+        )
+        _warm_up_table()
+
+
+def _warm_up_table():
+    from warmup import warm_up_progress
+
+    progress = warm_up_progress()
+    if progress is None:
+        return
+    timings = list(progress['timings'])
+    state = 'done' if progress['done'] else 'running'
+    st.caption(f"Server warm-up ({state}): {sum(seconds for _, seconds in timings):.1f} s")
+    if timings:
+        st.dataframe(pd.DataFrame(timings, columns=['step', 's']).round(2), hide_index=True, use_container_width=True)
+
+
+def start_profile(page):
+    """Begin profiling a page run; later stages on this thread attach to it."""
+    _local.profile = PageProfile(page)
+    return _local.profile
+
+
+def current_profile():
+    """The PageProfile of the page running on this thread (a throwaway one if none was started)."""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        profile = _local.profile = PageProfile(None)
+    return profile
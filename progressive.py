@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from figure_cache import cached_figure, get_figure_cache
+from filters import persisted_widget
+from profiling import start_profile
+from sampling import ApproximateView, load_sample
+
+# --- Progressive chart rendering ---
+# Each chart's exact figure is built on a background thread (one per page
+# run, so the charts share the filtered cube). If it is not ready within the
+# page's latency budget, a figure built from the stratified sample (see
+# sampling.py), with 95% error bars, is drawn in its place first; once the
+# exact figure is done it replaces the approximate one in the same slot.
+# Charts already in the figure cache, small datasets, streamed aggregates and
+# selections with fewer than MIN_SAMPLE_ROWS sampled rows skip all of this
+# and are drawn exactly. When the filters match no rows, a
+# message is shown in place of the charts.
+
+# Rows in the stratified sample; ACCIDENT_SAMPLE_ROWS overrides the default
+SAMPLE_ROWS = int(os.environ.get('ACCIDENT_SAMPLE_ROWS', 50_000))
+
+# How long a page waits for exact charts before drawing approximations; ACCIDENT_LATENCY_BUDGET_MS overrides
+LATENCY_BUDGET_MS = int(os.environ.get('ACCIDENT_LATENCY_BUDGET_MS', 300))
+
+# Fewest sampled rows in the selection for an approximate chart to be worth drawing
+MIN_SAMPLE_ROWS = 30
+
+# The settings survive page switches like the filters do, under their own prefix ("Clear filters" keeps them)
+_SETTINGS_PREFIX = '_approx_store_'
+
+
+def approximate_settings():
+    """Sidebar controls for approximate rendering: (enabled, sample_rows, budget_ms)."""
+    with st.sidebar.expander("Approximate rendering"):
+        enabled = persisted_widget(
+            st.toggle, "Draw approximate charts first", 'approx_enabled', True, bool,
+            help="Large datasets only: charts that take longer than the latency budget are first drawn from a stratified sample.",
+            store_prefix=_SETTINGS_PREFIX,
+        )
+        sample_rows = persisted_widget(
+            st.number_input, "Sample size (rows)", 'approx_sample_rows', SAMPLE_ROWS, int,
+            min_value=1_000, step=10_000, store_prefix=_SETTINGS_PREFIX,
+        )
+        budget_ms = persisted_widget(
+            st.number_input, "Latency budget (ms)", 'approx_budget_ms', LATENCY_BUDGET_MS, int,
+            min_value=0, step=100, store_prefix=_SETTINGS_PREFIX,
+        )
+    return enabled, int(sample_rows), int(budget_ms)
+
+
+class ProgressiveRenderer:
+    """Draws a page's charts, approximately first when the exact ones are slow."""
+
+    def __init__(self, view, profile):
+        self.view = view
+        self.profile = profile
+        self.approximate = None
+        self._pending = []
+        self._worker_profiles = []
+        self.empty = view.n_selected == 0
+        if self.empty:
+            st.warning("No accidents match the filters. Widen them or use 'Clear filters' in the sidebar.")
+            return
+
+        ctx = get_script_run_ctx()
+        index = getattr(view, 'index', None)
+        enabled, sample_rows, budget_ms = approximate_settings()
+        # Only for in-memory views over more rows than the sample, and only with a browser to update
+        if enabled and ctx is not None and index is not None and index.n_rows > sample_rows:
+            sample = load_sample(view.df, view.version, index, sample_rows)
+            self.approximate = ApproximateView(view, sample)
+            if int(self.approximate.mask.sum()) < MIN_SAMPLE_ROWS:
+                # Too few sampled rows in the selection to estimate anything: wait for the exact charts
+                self.approximate = None
+                return
+            self._deadline = time.perf_counter() + budget_ms / 1000
+            self._executor = ThreadPoolExecutor(max_workers=1, initializer=self._attach, initargs=(ctx,))
+
+    def _attach(self, ctx):
+        # Let the worker use st.cache_resource as part of this script run, and time it separately
+        add_script_run_ctx(threading.current_thread(), ctx)
+        self._worker_profiles.append(start_profile(self.profile.page))
+
+    def _exact(self, chart_id, build):
+        return cached_figure(self.view, chart_id, build)
+
+    def chart(self, chart_id, build):
+        """Draw `build(view)` as chart `chart_id` (nothing when the filters match no rows)."""
+        if self.empty:
+            return
+        key = (self.view.version, chart_id, self.view.state_key)
+        if self.approximate is None or key in get_figure_cache():
+            with self.profile.stage('render', chart_id):
+                st.plotly_chart(cached_figure(self.view, chart_id, build), use_container_width=True)
+            return
+
+        future = self._executor.submit(self._exact, chart_id, build)
+        try:
+            figure = future.result(timeout=max(0.0, self._deadline - time.perf_counter()))
+        except TimeoutError:
+            figure = None
+        slot = st.empty()
+        if figure is None:
+            with self.profile.stage('approximate', chart_id):
+                approximate = build(self.approximate).to_dict()
+                n_sample = int(self.approximate.mask.sum())
+                title = approximate['layout'].setdefault('title', {})
+                title['text'] = (
+                    f"{title.get('text', '')} "
+                    f"<sup>(approximate: {n_sample:,}-row stratified sample, 95% error bars; exact chart loading)</sup>"
+                )
+            with self.profile.stage('render', chart_id):
+                slot.plotly_chart(approximate, use_container_width=True)
+            self._pending.append((slot, chart_id, future))
+        else:
+            with self.profile.stage('render', chart_id):
+                slot.plotly_chart(figure, use_container_width=True)
+
+    def finish(self):
+        """Replace the approximate charts with the exact ones as they complete."""
+        for slot, chart_id, future in self._pending:
+            with self.profile.stage('wait exact', chart_id):
+                figure = future.result()
+            with self.profile.stage('render', chart_id):
+                slot.plotly_chart(figure, use_container_width=True)
+        if self.approximate is not None:
+            self._executor.shutdown(wait=True)
+            for worker in self._worker_profiles:
+                self.profile.absorb(worker)
@@ -0,0 +1,180 @@
+import math
+from itertools import combinations, product
+
+import numpy as np
+import pandas as pd
+
+from cube import CUBE_DIMENSIONS, CategoryCube
+from profiling import current_profile
+
+# --- Severity risk statistics ---
+# Everything here is computed from the (filtered) category cube: for a set of
+# factors the cube is summed down to a factor levels x severity table, and the
+# rates, intervals and tests are array operations over that table. The rows
+# are never touched, so the whole report is recomputed on every filter change
+# in a few milliseconds.
+
+OUTCOME = 'Accident_Severity'
+SEVERE_LEVEL = 'Severe Accident'
+
+# Factors whose levels are compared: every category dimension of the cube
+RISK_FACTORS = [dim for dim in CUBE_DIMENSIONS if dim != OUTCOME]
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+
+def _outcome_table(cube, dims, outcome):
+    # Counts over (dims..., outcome levels) with the "missing" slots dropped
+    axes = [cube.dims.index(dim) for dim in dims] + [cube.dims.index(outcome)]
+    other = tuple(i for i in range(len(cube.dims)) if i not in axes)
+    table = cube.array.sum(axis=other)
+    table = np.moveaxis(table, np.argsort(np.argsort(axes)), range(len(axes)))
+    return table[tuple(slice(0, len(cube.levels[dim])) for dim in [*dims, outcome])]
+
+
+def wilson_interval(successes, totals, z=Z_95):
+    """Wilson score interval for the proportions successes / totals (arrays)."""
+    successes = np.asarray(successes, dtype=float)
+    totals = np.asarray(totals, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = successes / totals
+        denominator = 1 + z ** 2 / totals
+        centre = (p + z ** 2 / (2 * totals)) / denominator
+        half = z * np.sqrt(p * (1 - p) / totals + z ** 2 / (4 * totals ** 2)) / denominator
+    return centre - half, centre + half
+
+
+def relative_risk(severe, totals, group=None, z=Z_95):
+    """Risk of each condition against everything outside it, with a log-scale (Katz) interval.
+
+    Conditions sharing a `group` id are one partition of the accidents (the
+    levels of a factor, or of a factor pair), and each is compared with the
+    rest of its partition. Without `group` all conditions form one partition.
+    """
+    severe = np.asarray(severe, dtype=float)
+    totals = np.asarray(totals, dtype=float)
+    group = np.zeros(len(totals), dtype=np.intp) if group is None else np.asarray(group)
+    rest_severe = np.bincount(group, weights=severe)[group] - severe
+    rest_totals = np.bincount(group, weights=totals)[group] - totals
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rr = (severe / totals) / (rest_severe / rest_totals)
+        se = np.sqrt(1 / severe - 1 / totals + 1 / rest_severe - 1 / rest_totals)
+        low, high = rr * np.exp(-z * se), rr * np.exp(z * se)
+    return rr, low, high
+
+
+def chi2_sf(statistic, dof):
+    """Upper tail probability of the chi-square distribution (closed form for integer dof)."""
+    if dof <= 0 or not np.isfinite(statistic):
+        return float('nan')
+    half = statistic / 2
+    if dof % 2 == 0:
+        terms = range(dof // 2)
+        return min(1.0, math.exp(-half) * sum(half ** i / math.factorial(i) for i in terms))
+    tail = math.erfc(math.sqrt(half))
+    for i in range(1, (dof + 1) // 2):
+        tail += math.exp((i - 0.5) * math.log(half) - half - math.lgamma(i + 0.5)) if half > 0 else 0.0
+    return min(1.0, tail)
+
+
+def chi_square_tests(cube, factors=RISK_FACTORS, outcome=OUTCOME):
+    """Pearson chi-square test of independence between each factor and the severity.
+
+    One row per factor: chi2, dof, p_value and Cramer's V (strength of the
+    association on a 0-1 scale). Empty levels are left out of each table.
+    """
+    rows = []
+    factors = [factor for factor in factors if factor in cube]
+    cube = _marginal(cube, set(factors) | {outcome})
+    for factor in factors:
+        table = _outcome_table(cube, [factor], outcome).astype(float)
+        table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+        n = table.sum()
+        if table.shape[0] < 2 or table.shape[1] < 2:
+            rows.append({'factor': factor, 'chi2': np.nan, 'dof': 0, 'p_value': np.nan, 'cramers_v': np.nan})
+            continue
+        expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+        chi2 = float(((table - expected) ** 2 / expected).sum())
+        dof = (table.shape[0] - 1) * (table.shape[1] - 1)
+        rows.append({
+            'factor': factor,
+            'chi2': chi2,
+            'dof': dof,
+            'p_value': chi2_sf(chi2, dof),
+            'cramers_v': math.sqrt(chi2 / (n * (min(table.shape) - 1))),
+        })
+    return pd.DataFrame(rows, columns=['factor', 'chi2', 'dof', 'p_value', 'cramers_v'])
+
+
+def _marginal(cube, dims):
+    # Cube summed down to `dims` (in cube order); every later table is a sum over this small array
+    axes = tuple(i for i, dim in enumerate(cube.dims) if dim not in dims)
+    kept = [dim for dim in cube.dims if dim in dims]
+    return CategoryCube(kept, {dim: cube.levels[dim] for dim in kept}, cube.array.sum(axis=axes))
+
+
+def severity_rates(cube, groups, outcome=OUTCOME, severe=SEVERE_LEVEL, z=Z_95):
+    """Severe-accident rate for every combination of levels of each tuple of factors in `groups`.
+
+    Returns one row per non-empty condition with the accident and severe
+    counts, the rate and its Wilson interval, and the relative risk against
+    the other conditions of the same factor(s) with its interval. All groups
+    are evaluated together as flat arrays.
+    """
+    groups = [tuple(dims) for dims in groups]
+    cube = _marginal(cube, {dim for dims in groups for dim in dims} | {outcome})
+    severe_index = cube.levels[outcome].index(severe) if severe in cube.levels[outcome] else None
+
+    factor, condition, group, totals, severe_counts = [], [], [], [], []
+    for i, dims in enumerate(groups):
+        table = _outcome_table(cube, dims, outcome)
+        n_conditions = table[..., 0].size
+        totals.append(table.sum(axis=-1).ravel())
+        severe_counts.append(table[..., severe_index].ravel() if severe_index is not None else np.zeros(n_conditions, dtype=np.int64))
+        factor += [' × '.join(dims)] * n_conditions
+        condition += [', '.join(map(str, levels)) for levels in product(*(cube.levels[dim] for dim in dims))]
+        group.append(np.full(n_conditions, i))
+    totals = np.concatenate(totals)
+    severe_counts = np.concatenate(severe_counts)
+    group = np.concatenate(group)
+
+    rate_low, rate_high = wilson_interval(severe_counts, totals, z)
+    rr, rr_low, rr_high = relative_risk(severe_counts, totals, group, z)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = severe_counts / totals
+    result = pd.DataFrame({
+        'factor': factor,
+        'condition': condition,
+        'accidents': totals,
+        'severe': severe_counts,
+        'rate': rates,
+        'rate_low': rate_low,
+        'rate_high': rate_high,
+        'relative_risk': rr,
+        'rr_low': rr_low,
+        'rr_high': rr_high,
+    })
+    return result[result['accidents'] > 0].reset_index(drop=True)
+
+
+def factor_risks(cube, factors=RISK_FACTORS, pairs=False, **kwargs):
+    """severity_rates() for every factor and, with pairs=True, every pair of factors."""
+    factors = [factor for factor in factors if factor in cube]
+    groups = [(factor,) for factor in factors]
+    if pairs:
+        groups += list(combinations(factors, 2))
+    return severity_rates(cube, groups, **kwargs)
+
+
+def most_dangerous(cube, factors=RISK_FACTORS, min_accidents=50, top=10, **kwargs):
+    """Single conditions and condition pairs ranked by how severe their accidents are.
+
+    Ranked on the lower bound of the severe-rate interval, so a high rate
+    measured on a handful of accidents does not outrank a well-supported one.
+    Conditions with fewer than `min_accidents` accidents are left out.
+    """
+    with current_profile().stage('risk statistics'):
+        risks = factor_risks(cube, factors, pairs=True, **kwargs)
+        risks = risks[risks['accidents'] >= min_accidents]
+        return risks.sort_values('rate_low', ascending=False, kind='stable').head(top).reset_index(drop=True)
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from aggregates import summary_from_histogram
+from cube import CategoryCube
+from data import NUMERIC_COLUMNS
+from profiling import current_profile
+
+# --- Stratified sample for approximate charts ---
+# A fixed sample of rows is drawn per dataset version, stratified by
+# Accident_Severity with proportional allocation. Counts are estimated by
+# weighting each sampled row with N_h / n_h (its stratum's population over
+# its sample size); filters are applied to the sample rows only, so an
+# approximate chart costs O(sample) whatever the dataset size. Every estimate
+# carries a standard error from the usual stratified-sampling variance
+#   Var = sum_h N_h^2 (1 - n_h / N_h) p_h (1 - p_h) / (n_h - 1)
+# where p_h is the share of stratum h's sample falling in the cell.
+
+STRATA = 'Accident_Severity'
+
+# Two-sided 95% normal quantile, used for the error bars
+Z_95 = 1.959963984540054
+
+
+class StratifiedSample:
+    """Sampled row positions with their strata, cube keys and numeric values."""
+
+    def __init__(self, df, index, size, seed=0):
+        self.index = index
+        strata_axis = index.dims.index(STRATA) if STRATA in index.dims else None
+        if strata_axis is None:
+            strata = np.zeros(index.n_rows, dtype=np.intp)
+        else:
+            # The stratum's coordinate in the flat cube key, without unravelling every dimension
+            stride = int(np.prod(index.shape[strata_axis + 1:]))
+            strata = index.key // stride % index.shape[strata_axis]
+        population = np.bincount(strata, minlength=int(strata.max(initial=0)) + 1)
+
+        # Proportional allocation, at least 2 rows per stratum so its variance is defined
+        allocation = np.minimum(population, np.maximum(2, np.rint(size * population / max(index.n_rows, 1)).astype(np.int64)))
+        rng = np.random.default_rng(seed)
+        rows = [
+            rng.choice(np.flatnonzero(strata == h), allocation[h], replace=False)
+            for h in range(len(population)) if allocation[h] > 0
+        ]
+        self.rows = np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+        self.strata = strata[self.rows]
+        self.key = index.key[self.rows]
+        self.population = population
+        self.allocation = allocation
+        self.numeric = {
+            column: df[column].to_numpy(dtype=float)[self.rows]
+            for column in NUMERIC_COLUMNS if column in df.columns
+        }
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def weights(self):
+        """N_h / n_h for each stratum."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.allocation > 0, self.population / np.maximum(self.allocation, 1), 0.0)
+
+    def selected(self, bitmap):
+        """Boolean mask over the sample rows for a packed row bitmap (all rows if None)."""
+        if bitmap is None:
+            return np.ones(len(self.rows), dtype=bool)
+        return ((bitmap[self.rows >> 3] >> (7 - (self.rows & 7)).astype(np.uint8)) & 1).astype(bool)
+
+    def estimate(self, sample_counts):
+        """(estimate, standard error) of population counts from per-stratum sample counts.
+
+        `sample_counts` has the strata on its last axis.
+        """
+        n = self.allocation.astype(float)
+        population = self.population.astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = np.where(n > 0, sample_counts / np.maximum(n, 1), 0.0)
+            factor = np.where(n > 1, population ** 2 * (1 - n / population) / (n - 1), 0.0)
+        estimate = (sample_counts * self.weights).sum(axis=-1)
+        variance = (factor * p * (1 - p)).sum(axis=-1)
+        return estimate, np.sqrt(variance)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _sample_for_version(version, size, _df, _index):
+    return StratifiedSample(_df, _index, size)
+
+
+def load_sample(df, version, index, size):
+    """The stratified sample of `size` rows for dataset `version`, shared across sessions."""
+    return _sample_for_version(version, size, df, index)
+
+
+class SampleCube:
+    """Estimated counts with the query interface of cube.CategoryCube.
+
+    count() returns the same frame as CategoryCube.count() (counts rounded to
+    whole accidents) plus an 'Error' column: the half-width of the 95%
+    interval, for error bars.
+    """
+
+    def __init__(self, sample, mask):
+        self.sample = sample
+        index = sample.index
+        self.dims = index.dims
+        self.levels = index.levels
+        self._counts = CategoryCube(
+            self.dims, self.levels, np.bincount(sample.key[mask], minlength=int(np.prod(index.shape))).reshape(index.shape)
+        )
+
+    def __contains__(self, dim):
+        return dim in self.levels
+
+    @property
+    def total(self):
+        estimate, _ = self.sample.estimate(self._strata_counts(()))
+        return int(round(float(estimate)))
+
+    def _strata_counts(self, dims):
+        # Sample counts over (dims..., strata) in level order, missing slots dropped
+        if STRATA not in self.dims:
+            table = self._counts.array.sum(axis=tuple(i for i, dim in enumerate(self.dims) if dim not in dims))
+            return table[tuple(slice(0, len(self.levels[dim])) for dim in dims)][..., np.newaxis]
+        keep = [*dims, STRATA] if STRATA not in dims else list(dims)
+        axes = [self.dims.index(dim) for dim in keep]
+        other = tuple(i for i in range(len(self.dims)) if i not in axes)
+        table = np.moveaxis(self._counts.array.sum(axis=other), np.argsort(np.argsort(axes)), range(len(axes)))
+        table = table[tuple(slice(0, len(self.levels[dim])) for dim in keep)]
+        if STRATA in dims:
+            # Each cell lies inside one stratum: give it a strata axis of its own that is zero elsewhere
+            axis = list(dims).index(STRATA)
+            n_strata = table.shape[axis]
+            one_hot = np.eye(n_strata, dtype=table.dtype).reshape([1] * axis + [n_strata] + [1] * (table.ndim - axis - 1) + [n_strata])
+            table = table[..., np.newaxis] * one_hot
+        return table
+
+    def count(self, *dims, name='Count'):
+        with current_profile().stage('aggregate (sample)'):
+            estimate, error = self.sample.estimate(self._strata_counts(dims))
+            index = pd.MultiIndex.from_product([self.levels[dim] for dim in dims], names=list(dims))
+            counts = pd.DataFrame({name: np.rint(estimate.ravel()).astype(np.int64), 'Error': Z_95 * error.ravel()}, index=index)
+            counts = counts[counts[name] > 0]
+            if len(dims) == 1:
+                counts = counts.sort_values(name, ascending=False, kind='stable')
+            return counts.reset_index()
+
+
+class ApproximateView:
+    """Stand-in for a FilteredView that answers from the stratified sample."""
+
+    approximate = True
+
+    def __init__(self, view, sample):
+        self.view = view
+        self.sample = sample
+        self.version = view.version
+        self.state_key = view.state_key
+        self.mask = sample.selected(view.bitmap)
+        self.cube = SampleCube(sample, self.mask)
+
+    def __contains__(self, column):
+        return column in self.view
+
+    @property
+    def n_selected(self):
+        return self.cube.total
+
+    def numeric_summary(self, column, nbins=20):
+        """numeric_summary() from the sample, with an 'errors' entry per bin (95% half-widths)."""
+        with current_profile().stage('aggregate (sample)'):
+            values = self.sample.numeric[column][self.mask]
+            strata = self.sample.strata[self.mask]
+            keep = ~np.isnan(values)
+            values, strata = values[keep], strata[keep]
+            uniques, inverse = np.unique(values, return_inverse=True)
+            weighted = np.bincount(inverse, weights=self.sample.weights[strata], minlength=len(uniques))
+            summary = summary_from_histogram(uniques, weighted, nbins=nbins)
+
+            edges = summary['edges']
+            n_strata = len(self.sample.population)
+            per_stratum = np.stack(
+                [np.histogram(values[strata == h], bins=edges)[0] for h in range(n_strata)], axis=-1
+            )
+            estimate, error = self.sample.estimate(per_stratum)
+            summary['counts'] = np.rint(estimate).astype(np.int64)
+            summary['errors'] = Z_95 * error
+            return summary
@@ -0,0 +1,194 @@
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# --- Memory-mapped column store shared by all sessions and processes ---
+# A dataset is published once as a directory of raw column files (one per
+# column; categoricals as integer codes plus their category list) and opened
+# with np.memmap. Every session and every server process then maps the same
+# read-only pages from the OS page cache instead of holding a private copy,
+# and a new session only maps files (no parsing).
+#
+# Appended rows are written to the end of the column files and published as a
+# new version: one small meta-<version>.json per version records how many
+# rows it has, so earlier versions stay valid (they only map a shorter
+# prefix). A store is addressed by its (directory, version) handle.
+
+
+def _meta_file(store):
+    directory, version = store
+    return os.path.join(directory, f"meta-{version}.json")
+
+
+def _read_meta(store):
+    try:
+        with open(_meta_file(store)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_meta(store, meta):
+    target = _meta_file(store)
+    tmp = target + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, target)
+
+
+def publish_store(df, directory, version):
+    """Write `df` as a new column store in `directory` holding dataset `version`; returns its handle.
+
+    Atomic: readers never see a partial store.
+    """
+    store = (directory, version)
+    if _read_meta(store) is not None:
+        return store
+    tmp = directory + f".{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    meta = {"n_rows": len(df), "columns": []}
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        entry = {"name": column, "file": f"{i}.bin"}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            entry["categories"] = values.cat.categories.tolist()
+            values = values.cat.codes
+        values = values.to_numpy()
+        entry["dtype"] = values.dtype.str
+        values.tofile(os.path.join(tmp, entry["file"]))
+        meta["columns"].append(entry)
+    _write_meta((tmp, version), meta)
+
+    try:
+        os.rename(tmp, directory)
+    except OSError:
+        if _read_meta(store) is None:
+            # A stale store (older format, or its version since pruned) is in the way
+            shutil.rmtree(directory, ignore_errors=True)
+            os.rename(tmp, directory)
+        else:
+            # Another process published this store first
+            shutil.rmtree(tmp, ignore_errors=True)
+    return store
+
+
+def _appended_column(entry, values):
+    # (updated meta entry, array to append) for one column, or None if the stored dtype cannot hold `values`
+    entry = dict(entry)
+    dtype = np.dtype(entry["dtype"])
+    if "categories" in entry:
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            return None
+        # New levels go after the stored ones, so the codes already written keep their meaning
+        categories = entry["categories"] + [c for c in values.cat.categories.tolist() if c not in entry["categories"]]
+        if len(categories) > np.iinfo(dtype).max:
+            return None
+        lookup = np.append(pd.Index(categories).get_indexer(values.cat.categories), -1)
+        entry["categories"] = categories
+        return entry, lookup[values.cat.codes.to_numpy()].astype(dtype)
+    values = values.to_numpy()
+    with np.errstate(invalid="ignore"):
+        cast = values.astype(dtype)
+    if not np.array_equal(cast.astype(float), values.astype(float), equal_nan=True):
+        return None
+    return entry, cast
+
+
+def append_store(store, df, version):
+    """Append the rows of `df` to the store `store` and publish the result as dataset `version`.
+
+    Returns the new handle, or None when the rows do not fit the stored
+    columns (different columns, wider values, too many levels); the caller
+    then publishes a fresh store.
+    """
+    directory, parent = store
+    meta = _read_meta(store)
+    if meta is None or [entry["name"] for entry in meta["columns"]] != list(df.columns):
+        return None
+    columns = [_appended_column(entry, df[entry["name"]]) for entry in meta["columns"]]
+    if any(column is None for column in columns):
+        return None
+
+    n_rows = meta["n_rows"]
+    # Versions past the parent (from an abandoned line of appends) are about to be overwritten
+    for other, other_meta in _versions(directory):
+        if other_meta["n_rows"] > n_rows:
+            os.remove(_meta_file(other))
+    for entry, values in columns:
+        with open(os.path.join(directory, entry["file"]), "r+b") as f:
+            f.truncate(n_rows * values.dtype.itemsize)
+            f.seek(0, os.SEEK_END)
+            values.tofile(f)
+
+    new = (directory, version)
+    _write_meta(new, {
+        "n_rows": n_rows + len(df),
+        "columns": [entry for entry, _ in columns],
+        "parent": parent,
+        "parent_rows": n_rows,
+    })
+    return new
+
+
+def _versions(directory):
+    # [(handle, meta)] of every version published in `directory`
+    versions = []
+    for file in glob.glob(os.path.join(directory, "meta-*.json")):
+        version = os.path.basename(file)[len("meta-"):-len(".json")]
+        meta = _read_meta((directory, version))
+        if meta is not None:
+            versions.append(((directory, version), meta))
+    return versions
+
+
+def latest_store(directory):
+    """Handle of the version in `directory` with the most rows, or None if there is none."""
+    versions = _versions(directory)
+    if not versions:
+        return None
+    return max(versions, key=lambda version: version[1]["n_rows"])[0]
+
+
+def prune_store(directory, keep=4):
+    """Forget all but the `keep` newest versions published in `directory`."""
+    versions = sorted(_versions(directory), key=lambda version: version[1]["n_rows"], reverse=True)
+    for store, _ in versions[keep:]:
+        try:
+            os.remove(_meta_file(store))
+        except FileNotFoundError:
+            pass
+
+
+def _map(file, dtype, n_rows):
+    if n_rows == 0:
+        return np.empty(0, dtype=dtype)  # an empty file cannot be mapped
+    return np.memmap(file, dtype=dtype, mode="r", shape=(n_rows,))
+
+
+def open_store(store):
+    """Zero-copy, read-only DataFrame over a published store version, or None if there is none.
+
+    `df.attrs` records the handle ('store') and the version it was appended
+    to ('parent', 'parent_rows'; None for a freshly published store), so
+    derived indexes can be extended instead of rebuilt.
+    """
+    meta = _read_meta(store)
+    if meta is None:
+        return None
+
+    directory, _ = store
+    columns = {}
+    for entry in meta["columns"]:
+        values = _map(os.path.join(directory, entry["file"]), entry["dtype"], meta["n_rows"])
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(values, categories=pd.Index(entry["categories"]), validate=False)
+        columns[entry["name"]] = values
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs.update(store=store, parent=meta.get("parent"), parent_rows=meta.get("parent_rows"))
+    return df
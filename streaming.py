@@ -0,0 +1,153 @@
+import os
+import pickle
+
+import pandas as pd
+import streamlit as st
+
+from aggregates import merge_value_histograms, summary_from_histogram, value_histogram
+from cube import CUBE_DIMENSIONS, build_cube
+from data import CACHE_DIR, CSV_DTYPES, DATA_FILE, NUMERIC_COLUMNS, cache_path, dataset_version, prune_cache
+from profiling import current_profile
+
+# --- Out-of-core streaming ingestion ---
+# For feeds that do not fit in memory as one DataFrame, the CSV is read in
+# chunks and each chunk is folded into the running aggregates the pages draw
+# from: the category cube and one value histogram per numeric column. Peak
+# memory is bounded by CHUNK_ROWS, not by the file size, and the full frame
+# is never materialised.
+
+CHUNK_ROWS = 250_000
+
+# Files larger than this are streamed; ACCIDENT_STREAMING=1/0 forces the mode either way
+STREAMING_THRESHOLD_BYTES = 512 * 1024 * 1024
+
+
+class StreamingAggregates:
+    """Running cube + numeric value histograms, built one chunk at a time."""
+
+    def __init__(self):
+        self.n_rows = 0
+        self.cube = None
+        self.numeric = {}
+
+    def add_chunk(self, chunk):
+        partial = StreamingAggregates()
+        partial.n_rows = len(chunk)
+        partial.cube = build_cube(chunk, CUBE_DIMENSIONS)
+        partial.numeric = {column: value_histogram(chunk[column]) for column in NUMERIC_COLUMNS if column in chunk.columns}
+        return self.merge(partial)
+
+    def merge(self, other):
+        """Fold another StreamingAggregates (e.g. from a different chunk or worker) into this one."""
+        self.n_rows += other.n_rows
+        if other.cube is not None:
+            self.cube = other.cube if self.cube is None else self.cube.merge(other.cube)
+        for column, histogram in other.numeric.items():
+            if column in self.numeric:
+                histogram = merge_value_histograms(self.numeric[column], histogram)
+            self.numeric[column] = histogram
+        return self
+
+
+def aggregate_csv(path=DATA_FILE, chunk_rows=CHUNK_ROWS):
+    """Stream `path` in chunks of `chunk_rows` rows into a StreamingAggregates."""
+    aggregates = StreamingAggregates()
+    with pd.read_csv(path, chunksize=chunk_rows, dtype=CSV_DTYPES) as reader:
+        for chunk in reader:
+            aggregates.add_chunk(chunk)
+    return aggregates
+
+
+def streaming_enabled(path=DATA_FILE):
+    forced = os.environ.get("ACCIDENT_STREAMING")
+    if forced is not None:
+        return forced == "1"
+    try:
+        return os.path.getsize(path) > STREAMING_THRESHOLD_BYTES
+    except FileNotFoundError:
+        return False
+
+
+def _saved_aggregates(path, version):
+    try:
+        with open(cache_path(path, version, "aggregates.pkl"), "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def save_aggregates(aggregates, path, version):
+    """Persist `aggregates` for dataset `version` so other processes and appends can reuse them."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    target = cache_path(path, version, "aggregates.pkl")
+    tmp = target + f".{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(aggregates, f)
+    os.replace(tmp, target)
+
+
+def apply_delta(path, old_version, new_version, rows):
+    """Fold appended `rows` into the saved aggregates of `old_version`, saving them as `new_version`.
+
+    Does nothing when `old_version` was never aggregated; the next load then
+    scans the file once.
+    """
+    aggregates = _saved_aggregates(path, old_version)
+    if aggregates is not None:
+        save_aggregates(aggregates.add_chunk(rows), path, new_version)
+
+
+@st.cache_resource(show_spinner="Aggregating dataset...", max_entries=4)
+def _aggregates_for_version(path, version):
+    aggregates = _saved_aggregates(path, version)
+    if aggregates is None:
+        aggregates = aggregate_csv(path)
+        save_aggregates(aggregates, path, version)
+    prune_cache(path)
+    return aggregates
+
+
+def load_aggregates(path=DATA_FILE):
+    """Return (aggregates, version) for the streamed dataset, or (None, None) if it is missing."""
+    version = dataset_version(path)
+    if version is None:
+        return None, None
+    return _aggregates_for_version(path, version), version
+
+
+def filter_state_key(categories, ranges=None):
+    """Hashable, order-independent key for a filter selection (used by the figure cache)."""
+    return (
+        tuple((dim, tuple(sorted(map(str, values)))) for dim, values in sorted(categories.items())),
+        tuple(sorted((ranges or {}).items())),
+    )
+
+
+class AggregateView:
+    """Page view over streamed aggregates (same interface as filters.FilteredView).
+
+    Only category filters can be applied, by restricting the cube; numeric
+    summaries always describe the full dataset since no rows are kept.
+    """
+
+    def __init__(self, aggregates, version, categories):
+        self.aggregates = aggregates
+        self.version = version
+        self.categories = categories
+        self.state_key = filter_state_key(categories)
+        self.cube = aggregates.cube.restrict(categories) if categories else aggregates.cube
+
+    def __contains__(self, column):
+        return column in self.cube or column in self.aggregates.numeric
+
+    @property
+    def active(self):
+        return bool(self.categories)
+
+    @property
+    def n_selected(self):
+        return self.cube.total
+
+    def numeric_summary(self, column, nbins=20):
+        with current_profile().stage('aggregate'):
+            return summary_from_histogram(*self.aggregates.numeric[column], nbins=nbins)
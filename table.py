@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# --- Paginated data table ---
+# Only the visible page of rows is sent to the browser. Sorting and search
+# run on the server against per-column indexes built once per dataset
+# (a sort order and rank per sortable column, and rows grouped by value for
+# each searchable text column), so a page costs about the same at 15k or 10M
+# rows.
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+class TableIndex:
+    """Lazily built sort and search indexes over one DataFrame."""
+
+    def __init__(self, df):
+        self.df = df
+        self._sort = {}
+        self._groups = {}
+
+    def sort_order(self, column):
+        """(order, rank): row positions in ascending order of `column`, and each row's place in it."""
+        if column not in self._sort:
+            values = self.df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Sort categoricals by label, not by code
+                values = values.cat.reorder_categories(sorted(values.cat.categories))
+                keys = values.cat.codes.to_numpy()
+            else:
+                keys = values.to_numpy()
+            order = np.argsort(keys, kind='stable')
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            self._sort[column] = (order, rank)
+        return self._sort[column]
+
+    def _value_groups(self, column):
+        # Distinct values of `column`, and the row positions holding each one (ascending)
+        if column not in self._groups:
+            codes, uniques = pd.factorize(self.df[column])
+            order = np.argsort(codes, kind='stable')
+            offsets = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            labels = pd.Index(uniques).astype(str).str.lower()
+            self._groups[column] = (labels, order, offsets)
+        return self._groups[column]
+
+    def search(self, text, columns):
+        """Sorted row positions where any of `columns` contains `text` (case-insensitive)."""
+        text = text.lower()
+        matches = []
+        for column in columns:
+            labels, order, offsets = self._value_groups(column)
+            for i in np.flatnonzero(labels.str.contains(text, regex=False)):
+                matches.append(order[offsets[i]:offsets[i + 1]])
+        if not matches:
+            return np.array([], dtype=np.intp)
+        return np.unique(np.concatenate(matches))
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _index_for(dataset_key, _df):
+    return TableIndex(_df)
+
+
+def searchable_columns(df):
+    return [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(df[c])]
+
+
+def paged_table(df, dataset_key, key='table'):
+    """Render `df` as a server-side paginated, sortable and searchable table.
+
+    `dataset_key` identifies the contents of `df` (e.g. a version or hash), so
+    the indexes are built once per dataset and shared across sessions.
+    """
+    index = _index_for(dataset_key, df)
+    text_columns = searchable_columns(df)
+
+    controls = st.columns([3, 2, 1, 1])
+    search = controls[0].text_input("Search", key=f'{key}_search', placeholder=f"Search {', '.join(text_columns[:3])}...")
+    sort_column = controls[1].selectbox("Sort by", ['(file order)'] + list(df.columns), key=f'{key}_sort')
+    descending = controls[2].toggle("Descending", key=f'{key}_desc')
+    page_size = controls[3].selectbox("Rows", PAGE_SIZES, index=1, key=f'{key}_page_size')
+    columns = st.multiselect("Columns", list(df.columns), default=list(df.columns), key=f'{key}_columns')
+
+    # Row positions of the result, in display order
+    rows = index.search(search, text_columns) if search else None
+    if sort_column != '(file order)':
+        order, rank = index.sort_order(sort_column)
+        if rows is None:
+            rows = order
+        else:
+            rows = rows[np.argsort(rank[rows], kind='stable')]
+    n_rows = len(df) if rows is None else len(rows)
+    if descending:
+        rows = (np.arange(n_rows) if rows is None else rows)[::-1]
+
+    n_pages = max(1, -(-n_rows // page_size))
+    page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f'{key}_page')
+    start = (min(page, n_pages) - 1) * page_size
+    stop = min(start + page_size, n_rows)
+
+    visible = slice(start, stop) if rows is None else rows[start:stop]
+    st.dataframe(df.iloc[visible][columns or list(df.columns)], use_container_width=True)
+    st.caption(f"Rows {start + 1 if n_rows else 0:,}-{stop:,} of {n_rows:,} (page {page} of {n_pages:,})")
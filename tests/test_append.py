@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import data
+import streaming
+from data import CSV_DTYPES, MAX_PARTS, append_rows, apply_schema, load_dataset, make_dummy_data
+from filters import BitmapIndex
+from ingest import ingest_drop_folder
+
+
+def _fresh(path):
+    # The dataset as a full reparse of the CSV gives it
+    return apply_schema(pd.read_csv(path, dtype=CSV_DTYPES))
+
+
+class AppendTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        cache_dir = os.path.join(self.workdir, "cache")
+        patches = [
+            mock.patch.object(data, "CACHE_DIR", cache_dir),
+            mock.patch.object(data, "MANIFEST_FILE", os.path.join(cache_dir, "manifest.json")),
+            mock.patch.object(streaming, "CACHE_DIR", cache_dir),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.workdir, True)
+        self.cache_dir = cache_dir
+        self.path = os.path.join(self.workdir, "accidents.csv")
+        make_dummy_data(1001).to_csv(self.path, index=False)
+
+    def assertFramesEqual(self, df, expected):
+        self.assertEqual(list(df.columns), list(expected.columns))
+        self.assertEqual(len(df), len(expected))
+        for column in expected.columns:
+            if isinstance(expected[column].dtype, pd.CategoricalDtype):
+                self.assertEqual(df[column].astype(object).tolist(), expected[column].astype(object).tolist(), column)
+            else:
+                np.testing.assert_array_equal(df[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float), column)
+
+
+class AppendStoreTest(AppendTestCase):
+    def test_appended_store_matches_fresh_build(self):
+        df, _ = load_dataset(self.path)
+        directory = df.attrs["store"][0]
+        for seed in range(1, 4):
+            rows = make_dummy_data(13 * seed, seed=seed)
+            if seed == 2:
+                # A category level the store has not seen yet
+                rows["Weather"] = rows["Weather"].astype(object)
+                rows.loc[0, "Weather"] = "Snow"
+            append_rows(rows, self.path)
+            df, _ = load_dataset(self.path)
+            self.assertEqual(df.attrs["store"][0], directory)  # appended in place, not republished
+            self.assertFramesEqual(df, _fresh(self.path))
+        self.assertEqual(df.attrs["parent_rows"], 1001 + 13 + 26)
+
+    def test_rows_that_do_not_fit_republish_the_store(self):
+        df, _ = load_dataset(self.path)
+        rows = make_dummy_data(5, seed=1)
+        rows["Biker_Age"] = rows["Biker_Age"].astype(float)
+        rows.loc[0, "Biker_Age"] = np.nan  # no longer fits the stored uint8 column
+        append_rows(rows, self.path)
+        new, _ = load_dataset(self.path)
+        self.assertNotEqual(new.attrs["store"][0], df.attrs["store"][0])
+        self.assertIsNone(new.attrs["parent"])
+        self.assertFramesEqual(new, _fresh(self.path))
+
+    def test_parts_are_compacted_and_old_versions_pruned(self):
+        load_dataset(self.path)
+        for seed in range(MAX_PARTS + 1):
+            append_rows(make_dummy_data(3, seed=seed), self.path)
+        df, version = load_dataset(self.path)
+        parts = data._columnar_parts(self.path, version)
+        self.assertEqual(len(parts), 1)
+        self.assertFramesEqual(apply_schema(pd.read_parquet(parts[0][0])), _fresh(self.path))
+
+        fingerprint = data.file_fingerprint(self.path)
+        expected = {"manifest.json", "accidents-append.lock", fingerprint["store"], os.path.basename(parts[0][0])}
+        self.assertEqual(set(os.listdir(self.cache_dir)), expected)
+
+    def test_rows_not_matching_the_schema_are_refused(self):
+        _, version = load_dataset(self.path)
+        with open(self.path, "rb") as f:
+            before = f.read()
+        rows = make_dummy_data(3, seed=1)
+        rows["Biker_Age"] = rows["Biker_Age"].astype(object)
+        rows.loc[1, "Biker_Age"] = "abc"
+        with self.assertRaises(ValueError):
+            append_rows(rows, self.path)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(load_dataset(self.path)[1], version)
+
+    def test_drop_folder_moves_bad_files_to_failed(self):
+        folder = os.path.join(self.workdir, "incoming")
+        os.makedirs(folder)
+        good = make_dummy_data(4, seed=1)
+        bad = make_dummy_data(4, seed=2)
+        bad["Biker_Age"] = bad["Biker_Age"].astype(object)
+        bad.loc[0, "Biker_Age"] = "abc"
+        good.to_csv(os.path.join(folder, "a.csv"), index=False)
+        bad.to_csv(os.path.join(folder, "b.csv"), index=False)
+
+        ingested = ingest_drop_folder(folder, self.path)
+        self.assertEqual([os.path.basename(file) for file in ingested], ["a.csv"])
+        self.assertTrue(os.path.exists(os.path.join(folder, "failed", "b.csv")))
+        self.assertEqual(len(load_dataset(self.path)[0]), 1005)
+
+
+class ExtendedIndexTest(unittest.TestCase):
+    def assertIndexesEqual(self, index, expected):
+        self.assertEqual(index.n_rows, expected.n_rows)
+        self.assertEqual(index.levels, expected.levels)
+        np.testing.assert_array_equal(index.key, expected.key)
+        np.testing.assert_array_equal(index.cube.array, expected.cube.array)
+        for dim, bitmaps in expected.bitmaps.items():
+            for level, bitmap in bitmaps.items():
+                np.testing.assert_array_equal(index.bitmaps[dim][level], bitmap, f"{dim}={level}")
+        for column, (values, order) in expected.sorted.items():
+            np.testing.assert_array_equal(index.sorted[column][0], values, column)
+            np.testing.assert_array_equal(index.sorted[column][1], order, column)
+            self.assertEqual(index.sorted[column][1].dtype, order.dtype)
+
+    def test_extended_index_matches_fresh_build(self):
+        # 1001 rows: the appended rows start in the middle of a bitmap byte
+        df = pd.concat([make_dummy_data(1001), make_dummy_data(250, seed=1)], ignore_index=True)
+        index = BitmapIndex(df.iloc[:1001])
+        histogram = index.full_histogram(df.iloc[:1001], "Bike_Speed")
+        extended = index.extended(df)
+
+        expected = BitmapIndex(df)
+        self.assertIndexesEqual(extended, expected)
+        for got, want in zip(extended.full_histogram(df, "Bike_Speed"), expected.full_histogram(df, "Bike_Speed")):
+            np.testing.assert_array_equal(got, want)
+        # The parent index is left as it was
+        self.assertEqual(index.n_rows, 1001)
+        self.assertEqual(int(histogram[1].sum()), 1001)
+
+    def test_new_level_is_not_extended(self):
+        old = make_dummy_data(100)
+        new = make_dummy_data(10, seed=1)
+        new["Weather"] = new["Weather"].astype(object)
+        new.loc[0, "Weather"] = "Snow"
+        df = apply_schema(pd.concat([old.astype({"Weather": object}), new], ignore_index=True))
+        self.assertIsNone(BitmapIndex(df.iloc[:100]).extended(df))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import hashlib
+import http.server
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+
+from mirror import load_remote_csv, refresh_mirror
+
+
+class _Source(http.server.BaseHTTPRequestHandler):
+    # Serves `body` with an ETag and answers a matching If-None-Match with 304;
+    # with `fail` set, every request gets a 503 instead, and `delay` holds back the response
+    body = b""
+    fail = False
+    delay = 0
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        time.sleep(self.delay)
+        if self.fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        etag = '"%s"' % hashlib.md5(self.body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RefreshMirrorTest(unittest.TestCase):
+    def setUp(self):
+        _Source.body = "Weather,Count\nClear,3\nRainy,2\n".encode()
+        _Source.fail = False
+        _Source.delay = 0
+        _Source.requests = []
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Source)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/data.csv"
+        self.mirror_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.mirror_dir, ignore_errors=True)
+
+    def refresh(self, **kwargs):
+        return refresh_mirror(self.url, self.mirror_dir, timeout=5, **kwargs)
+
+    def test_downloaded_then_cached(self):
+        csv_path, meta = self.refresh()
+        self.assertEqual(meta["status"], "downloaded")
+        self.assertEqual(meta["encoding"], "utf-8")
+        self.assertTrue(meta["etag"])
+        with open(csv_path, "rb") as f:
+            self.assertEqual(f.read(), _Source.body)
+
+        _, meta = self.refresh()
+        self.assertEqual(meta["status"], "cached")
+        self.assertEqual(len(_Source.requests), 1)
+
+    def test_not_modified_revalidates_with_etag(self):
+        _, first = self.refresh()
+        _, meta = self.refresh(ttl=0)
+        self.assertEqual(meta["status"], "not-modified")
+        self.assertEqual(_Source.requests[-1]["If-None-Match"], first["etag"])
+        self.assertEqual(meta["sha256"], first["sha256"])
+        self.assertGreaterEqual(meta["checked_at"], first["checked_at"])
+
+    def test_changed_source_is_downloaded_again(self):
+        _, first = self.refresh()
+        _Source.body += b"Foggy,1\n"
+        _, meta = self.refresh(ttl=0)
+        self.assertEqual(meta["status"], "downloaded")
+        self.assertNotEqual(meta["sha256"], first["sha256"])
+
+    def test_offline_serves_previous_copy_and_backs_off(self):
+        _, first = self.refresh()
+        _Source.fail = True
+        csv_path, meta = self.refresh(ttl=0)
+        self.assertEqual(meta["status"], "offline")
+        self.assertEqual(meta["sha256"], first["sha256"])
+        with open(csv_path, "rb") as f:
+            self.assertEqual(f.read(), _Source.body)
+
+        # Within the retry window the source is not asked again
+        _, meta = self.refresh(ttl=0)
+        self.assertEqual(meta["status"], "offline")
+        self.assertEqual(len(_Source.requests), 2)
+
+        # Once it is back, the next revalidation clears the failure
+        _Source.fail = False
+        _, meta = self.refresh(ttl=0, retry=0)
+        self.assertEqual(meta["status"], "not-modified")
+        self.assertNotIn("failed_at", meta)
+
+    def test_unreachable_without_copy_raises(self):
+        _Source.fail = True
+        with self.assertRaises(urllib.error.URLError):
+            self.refresh()
+
+    def test_timeout_without_copy_raises_url_error(self):
+        _Source.delay = 1
+        with self.assertRaises(urllib.error.URLError):
+            refresh_mirror(self.url, self.mirror_dir, timeout=0.2)
+
+    def test_latin1_source(self):
+        _Source.body = "Road_Type,Count\nVillage Road,1\nCafé Road,2\n".encode("latin-1")
+        df, meta = load_remote_csv(self.url, mirror_dir=self.mirror_dir, timeout=5)
+        self.assertEqual(meta["encoding"], "latin-1")
+        self.assertEqual(list(df["Road_Type"]), ["Village Road", "Café Road"])
+
+
+if __name__ == "__main__":
+    unittest.main()
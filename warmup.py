@@ -0,0 +1,118 @@
+import logging
+import os
+import runpy
+import threading
+import time
+
+import streamlit as st
+
+from data import DATA_FILE, load_dataset
+from filters import load_index
+from streaming import load_aggregates, streaming_enabled
+
+# --- Server warm-up ---
+# Loads the dataset, builds the bitmap index and page aggregates, then runs
+# every page once headlessly so the shared figure cache holds the unfiltered
+# charts. main.py starts this on a background thread on the first request to
+# a server process, so that request is not held up by it: pages shown while
+# it runs share its caches and only wait for the parts they need.
+#
+# `python warmup.py` before `streamlit run` only fills the on-disk caches
+# (Parquet copy, memory-mapped store, saved aggregates); the in-memory ones
+# (index, figure cache) belong to the server process and start empty.
+
+PAGES = ['page1.py', 'page2.py', 'page3.py', 'page4.py', 'page5.py']
+
+# Progress is logged with its own handler: under `streamlit run` the root logger has none and sits at WARNING
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.propagate = False
+
+# Progress of the server's background warm-up (see start_warm_up), shown in the performance panel
+_progress = None
+
+
+def _outside_warm_up(record):
+    # Headless page runs log a "missing ScriptRunContext" warning per st call; drop only the warm-up threads' ones
+    return not record.threadName.startswith('warmup')
+
+
+logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').addFilter(_outside_warm_up)
+
+
+def _run_page(page):
+    # A thread has no ScriptRunContext, so the page runs headlessly ("bare mode"):
+    # nothing is rendered into any session, but the shared caches are filled.
+    errors = []
+
+    def target():
+        try:
+            runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), page), run_name='__main__')
+        except Exception as error:  # a broken page must not stop the warm-up of the others
+            errors.append(error)
+
+    thread = threading.Thread(target=target, name=f'warmup-{page}')
+    thread.start()
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def warm_up(pages=PAGES, path=DATA_FILE, timings=None):
+    """Fill the shared caches; returns [(step, seconds)] and logs each step as it finishes.
+
+    Steps are appended to `timings` (if given) as they finish.
+    """
+    timings = [] if timings is None else timings
+
+    def step(name, action):
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception:
+            logger.exception("warm-up step %r failed", name)
+        seconds = time.perf_counter() - start
+        timings.append((name, seconds))
+        logger.info("warm-up: %s (%.2fs)", name, seconds)
+
+    if streaming_enabled(path):
+        step('aggregate dataset (streaming)', lambda: load_aggregates(path))
+    else:
+        def load():
+            df, version = load_dataset(path)
+            load_index(df, version)
+        step('load dataset + bitmap index', load)
+    for page in pages:
+        step(f'render {page}', lambda page=page: _run_page(page))
+
+    logger.info("warm-up finished in %.2fs", sum(seconds for _, seconds in timings))
+    return timings
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Run warm_up() on a background thread, at most once per server process; returns the thread."""
+    global _progress
+    _progress = {'timings': [], 'done': False}
+
+    def run(progress):
+        try:
+            warm_up(timings=progress['timings'])
+        finally:
+            progress['done'] = True
+
+    thread = threading.Thread(target=run, args=(_progress,), name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up_progress():
+    """{'timings': [(step, seconds)], 'done': bool} of this process's warm-up, or None if none was started."""
+    return _progress
+
+
+if __name__ == '__main__':
+    for name, seconds in warm_up():
+        print(f"{name:<36}{seconds:>8.2f}s")